@@ -1,4 +1,18 @@
-from typing import List, Dict, Callable
+import ast
+import hashlib
+import json
+import sqlite3
+import string
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from types import CodeType, FunctionType, MethodType
+from typing import List, Dict, Callable, Iterable, Iterator, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # only needed for validate_columnar
+    np = None
 
 class Config:
     """Represents a service configuration with basic safety defaults."""
@@ -38,43 +52,549 @@ class ConfigValidator:
             return "Security Error: 'default' security group is blocked in prod"
         return None
 
+    def validate_one(self, data: Dict) -> Dict:
+        """Result for a single config: {"service", "status", "reasons", "warning"}."""
+        config = Config(data)
+        errors = []
+
+        # Run all rules against the config
+        for rule in self.rules:
+            error = rule(config)
+            if error:
+                errors.append(error)
+
+        # Categorize the result
+        if errors:
+            return {"service": config.service, "status": "Blocked", "reasons": errors, "warning": None}
+
+        # Add a warning if SG is default in non-prod
+        warning = None
+        if config.security_group == "default":
+            warning = f"{config.service}: Using default SG in {config.env}"
+        return {"service": config.service, "status": "Deployable", "reasons": [], "warning": warning}
+
+    def validate_iter(self, raw_configs: Iterable[Dict], workers: int = 0,
+                      chunk_size: int = 1000) -> Iterator[Dict]:
+        """
+        Lazily yields one result per config, in input order. With workers > 1 the
+        configs are validated in chunks on a process pool; only a few chunks per
+        worker are in flight, so memory stays bounded however large the input.
+        """
+        if workers <= 1:
+            for data in raw_configs:
+                yield self.validate_one(data)
+            return
+
+        configs = iter(raw_configs)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = []
+            while True:
+                while len(in_flight) < workers * 2:
+                    chunk = list(islice(configs, chunk_size))
+                    if not chunk:
+                        break
+                    in_flight.append(pool.submit(_validate_chunk, self, chunk))
+                if not in_flight:
+                    return
+                yield from in_flight.pop(0).result()
+
     def validate(self, raw_configs: List[Dict]):
-        report = {"Deployable": [], "Blocked": [], "Warnings": []}
-
-        for data in raw_configs:
-            config = Config(data)
-            errors = []
-
-            # Run all rules against the config
-            for rule in self.rules:
-                error = rule(config)
-                if error:
-                    errors.append(error)
-
-            # Categorize the result
-            if errors:
-                report["Blocked"].append({
-                    "service": config.service,
-                    "reasons": errors
-                })
+        return summarize(self.validate_iter(raw_configs))
+
+    def rule_set_hash(self) -> str:
+        """
+        Changes whenever anything that decides a result changes, invalidating
+        cached results: the rules' code, the names they read, nested code
+        (comprehensions, lambdas), the simple values they read by name (thresholds
+        on the validator or its class, module constants) and helper functions they
+        call, plus validate_one and Config's defaults. Stable across processes.
+        """
+        h = hashlib.sha256()
+        seen = set()
+        for fn in (Config.__init__, type(self).validate_one, *self.rules):
+            h.update(fn.__name__.encode())
+            _hash_function(getattr(fn, "__func__", fn), h, self, seen)
+        return h.hexdigest()
+
+
+_MISSING = object()
+
+def _is_simple(value) -> bool:
+    if isinstance(value, (tuple, frozenset)):
+        return all(_is_simple(v) for v in value)
+    return value is None or isinstance(value, (bool, int, float, str, bytes))
+
+def _stable_repr(value) -> str:
+    # frozenset order depends on the per-process string hash seed
+    if isinstance(value, frozenset):
+        return "frozenset({" + ",".join(sorted(_stable_repr(v) for v in value)) + "})"
+    if isinstance(value, tuple):
+        return "(" + ",".join(_stable_repr(v) for v in value) + ",)"
+    return repr(value)
+
+def _hash_function(func: FunctionType, h, owner, seen: set):
+    if id(func.__code__) in seen:
+        return
+    _hash_code(func.__code__, h, owner, func.__globals__, seen)
+
+def _hash_code(code: CodeType, h, owner, module_globals: Dict, seen: set):
+    seen.add(id(code))
+    h.update(code.co_code)
+    h.update(repr((code.co_name, code.co_names, code.co_varnames)).encode())
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            # Recurse rather than repr(), which embeds the object's address
+            _hash_code(const, h, owner, module_globals, seen)
+        else:
+            h.update(_stable_repr(const).encode())
+    for name in code.co_names:
+        value = getattr(owner, name, _MISSING)
+        if value is _MISSING:
+            value = module_globals.get(name, _MISSING)
+        if isinstance(value, MethodType):
+            value = value.__func__
+        if isinstance(value, FunctionType):
+            _hash_function(value, h, owner, seen)
+        elif value is not _MISSING and _is_simple(value):
+            h.update(f"{name}={_stable_repr(value)}".encode())
+
+
+# --- Compiled rule engine ---
+# Rules declared as data, fused into one generated function per environment.
+
+# Same fields and defaults as Config
+FIELD_DEFAULTS = {
+    "service": "unknown-service",
+    "env": "dev",
+    "cpu": 0,
+    "memory": 0,
+    "replicas": 0,
+    "security_group": None,
+}
+
+@dataclass(frozen=True)
+class RuleSpec:
+    """
+    A declarative rule. `fails` is an expression over config fields that is true
+    when the rule is violated; `message` is a str.format template rendered only on
+    failure. `envs` limits the rule to those environments (None = every env).
+    """
+    name: str
+    fails: str
+    message: str
+    envs: Optional[Tuple[str, ...]] = None
+
+    def __post_init__(self):
+        for node in ast.walk(ast.parse(self.fails, mode="eval")):
+            if isinstance(node, ast.Name) and node.id not in FIELD_DEFAULTS:
+                raise ValueError(f"Rule {self.name} uses unknown field: {node.id}")
+            if isinstance(node, (ast.Call, ast.Attribute, ast.Lambda)):
+                raise ValueError(f"Rule {self.name} may only compare fields")
+        for _, field, spec, conversion in string.Formatter().parse(self.message):
+            if field is not None and (field not in FIELD_DEFAULTS or spec or conversion):
+                raise ValueError(f"Rule {self.name} message uses unsupported placeholder: {field}")
+
+# Declarative equivalent of ConfigValidator.rules
+DEFAULT_RULE_SPECS = [
+    RuleSpec("cpu_memory_ratio", "memory < cpu * 2",
+             "Resource Error: Memory ({memory}GB) must be at least 2x CPU ({cpu})"),
+    RuleSpec("prod_replicas", "replicas < 3",
+             "Reliability Error: Prod requires at least 3 replicas, found {replicas}", envs=("prod",)),
+    RuleSpec("security_group_missing", "not security_group",
+             "Security Error: Missing security_group"),
+    RuleSpec("prod_default_security_group", "security_group == 'default'",
+             "Security Error: 'default' security group is blocked in prod", envs=("prod",)),
+]
+
+class CompiledConfigValidator(ConfigValidator):
+    """
+    Drop-in ConfigValidator that runs RuleSpecs through generated code: one flat
+    function per env that reads each field once, evaluates only the rules that
+    apply to that env, and formats error strings only when a rule fails.
+    """
+    def __init__(self, rule_specs: Optional[List[RuleSpec]] = None):
+        super().__init__()
+        self.rule_specs = list(DEFAULT_RULE_SPECS if rule_specs is None else rule_specs)
+        self.compiled: Dict[str, Callable[[Dict], Dict]] = {}
+
+    def compile(self, env: str) -> Callable[[Dict], Dict]:
+        namespace = {}
+        lines = ["def _validate(data):"]
+        lines += [f"    {f} = data.get({f!r}, {default!r})" for f, default in FIELD_DEFAULTS.items()]
+        lines.append("    errors = None")
+        for spec in self.rule_specs:
+            if spec.envs is not None and env not in spec.envs:
+                continue
+            # Messages become f-strings: nothing is formatted unless the rule fails
+            lines += [
+                f"    if {spec.fails}:",
+                "        if errors is None:",
+                "            errors = []",
+                f"        errors.append(f{spec.message!r})",
+            ]
+        lines += [
+            "    if errors:",
+            "        return {'service': service, 'status': 'Blocked', 'reasons': errors, 'warning': None}",
+            "    warning = None",
+            "    if security_group == 'default':",
+            "        warning = f'{service}: Using default SG in {env}'",
+            "    return {'service': service, 'status': 'Deployable', 'reasons': [], 'warning': warning}",
+        ]
+        exec(compile("\n".join(lines), f"<rules:{env}>", "exec"), namespace)
+        return namespace["_validate"]
+
+    def validate_one(self, data: Dict) -> Dict:
+        env = data.get("env", FIELD_DEFAULTS["env"])
+        fn = self.compiled.get(env)
+        if fn is None:
+            fn = self.compiled[env] = self.compile(env)
+        return fn(data)
+
+    def __getstate__(self):
+        # Generated functions don't pickle; pool workers recompile on first use
+        state = self.__dict__.copy()
+        state["compiled"] = {}
+        return state
+
+    def rule_set_hash(self) -> str:
+        return hashlib.sha256(repr(self.rule_specs).encode()).hexdigest()
+
+    @classmethod
+    def from_dicts(cls, rule_dicts: List[Dict]) -> "CompiledConfigValidator":
+        """Builds a validator from plain rule dicts, e.g. loaded from JSON or YAML."""
+        return cls([RuleSpec(d["name"], d["fails"], d["message"], tuple(d["envs"]) if d.get("envs") else None)
+                    for d in rule_dicts])
+
+
+# --- Result cache ---
+
+class CachedConfigValidator:
+    """
+    Wraps a validator with an on-disk (SQLite) result cache for CI, where nearly
+    every config is unchanged between commits. Results are keyed on a hash of the
+    normalized config plus the validator's rule-set hash, so editing a rule
+    invalidates everything. Least recently used entries beyond `max_entries` are
+    evicted. `hits`/`misses` count lookups.
+    """
+    def __init__(self, validator: ConfigValidator, cache_path: str,
+                 max_entries: int = 1_000_000, chunk_size: int = 500):
+        self.validator = validator
+        self.max_entries = max_entries
+        self.chunk_size = chunk_size
+        self.rules_hash = validator.rule_set_hash()
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(cache_path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT, last_used INTEGER)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.tick = self.db.execute("SELECT COALESCE(MAX(last_used), 0) FROM results").fetchone()[0]
+
+    def _key(self, data: Dict) -> str:
+        # Normalize: only fields the rules see, defaults filled in, fixed field order
+        normalized = tuple([data.get(f, default) for f, default in FIELD_DEFAULTS.items()])
+        return hashlib.blake2b((repr(normalized) + self.rules_hash).encode(), digest_size=16).hexdigest()
+
+    def validate_iter(self, raw_configs: Iterable[Dict]) -> Iterator[Dict]:
+        configs = iter(raw_configs)
+        while True:
+            chunk = list(islice(configs, self.chunk_size))
+            if not chunk:
+                break
+            yield from self._validate_chunk(chunk)
+        self._evict()
+        self.db.commit()
+
+    def validate(self, raw_configs: List[Dict]):
+        return summarize(self.validate_iter(raw_configs))
+
+    def _validate_chunk(self, chunk: List[Dict]) -> List[Dict]:
+        keys = [self._key(data) for data in chunk]
+        placeholders = ",".join("?" * len(keys))
+        cached = dict(self.db.execute(
+            f"SELECT key, result FROM results WHERE key IN ({placeholders})", keys
+        ))
+
+        self.tick += 1
+        results, fresh = [], {}
+        for key, data in zip(keys, chunk):
+            if key in cached:
+                self.hits += 1
+                results.append(json.loads(cached[key]))
             else:
-                # Add a warning if SG is default in non-prod
-                if config.security_group == "default":
-                    report["Warnings"].append(f"{config.service}: Using default SG in {config.env}")
-                
-                report["Deployable"].append(config.service)
+                self.misses += 1
+                result = self.validator.validate_one(data)
+                fresh[key] = json.dumps(result)
+                results.append(result)
+
+        if cached:
+            self.db.execute(f"UPDATE results SET last_used = ? WHERE key IN ({','.join('?' * len(cached))})",
+                            [self.tick, *cached])
+        self.db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                            [(key, result, self.tick) for key, result in fresh.items()])
+        return results
+
+    def _evict(self):
+        count = self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count > self.max_entries:
+            self.db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
 
-        return report
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+# --- Columnar mode ---
+
+# Low-cardinality string fields, stored by load_columns as (codes, categories)
+CATEGORICAL_FIELDS = ("env", "security_group")
+
+
+def encode_categorical(values: Iterable) -> Tuple[List[int], list]:
+    """Factorizes values into small-int codes plus the distinct values they index."""
+    index = {}
+    codes = [index.setdefault(v, len(index)) for v in values]
+    return codes, list(index)
+
+
+def load_columns(raw_configs: Iterable[Dict]) -> Dict[str, object]:
+    """
+    Pivots config dicts into one list per field, defaults filled in. Fields in
+    CATEGORICAL_FIELDS become (codes, categories) pairs from encode_categorical.
+    """
+    raw_configs = list(raw_configs)
+    columns = {f: [c.get(f, default) for c in raw_configs] for f, default in FIELD_DEFAULTS.items()}
+    for f in CATEGORICAL_FIELDS:
+        columns[f] = encode_categorical(columns[f])
+    return columns
+
+
+def _category_codes(column) -> Tuple["np.ndarray", list]:
+    codes, categories = column if isinstance(column, tuple) else encode_categorical(column)
+    return np.asarray(codes, dtype=np.int32), categories
+
+
+def validate_columnar(configs) -> Dict:
+    """
+    Same report as ConfigValidator().validate for the built-in rules, computed
+    over whole columns: each rule is one NumPy boolean mask, and Python only
+    loops over blocked configs to format their reasons. env and security_group
+    are compared as integer codes, so string checks run once per distinct value.
+    Accepts config dicts or columns from load_columns (e.g. straight from a
+    columnar store; plain lists are encoded on the way in). Needs numpy.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for validate_columnar")
+
+    columns = configs if isinstance(configs, dict) else load_columns(configs)
+    cpu = np.asarray(columns["cpu"], dtype=np.float64)
+    memory = np.asarray(columns["memory"], dtype=np.float64)
+    replicas = np.asarray(columns["replicas"], dtype=np.float64)
+    env_codes, envs = _category_codes(columns["env"])
+    sg_codes, groups = _category_codes(columns["security_group"])
+    # Per-category lookups, gathered to per-config masks by code
+    is_prod = np.array([e == "prod" for e in envs], dtype=bool)[env_codes]
+    sg_missing = np.array([not g for g in groups], dtype=bool)[sg_codes]
+    sg_default = np.array([g == "default" for g in groups], dtype=bool)[sg_codes]
+
+    # One mask per rule, in ConfigValidator.rules order
+    ratio_fail = memory < cpu * 2
+    replicas_fail = is_prod & (replicas < 3)
+    sg_fail = sg_missing | (is_prod & sg_default)
+    blocked = ratio_fail | replicas_fail | sg_fail
+
+    services = columns["service"]
+    report = {"Deployable": [], "Blocked": [], "Warnings": []}
+
+    # Messages use the original column values so formatting matches exactly
+    blocked_idx = np.flatnonzero(blocked).tolist()
+    ratio_fail, replicas_fail = ratio_fail.tolist(), replicas_fail.tolist()
+    sg_missing, sg_fail = sg_missing.tolist(), sg_fail.tolist()
+    cpu_raw, memory_raw, replicas_raw = columns["cpu"], columns["memory"], columns["replicas"]
+    for i in blocked_idx:
+        reasons = []
+        if ratio_fail[i]:
+            reasons.append(f"Resource Error: Memory ({memory_raw[i]}GB) must be at least 2x CPU ({cpu_raw[i]})")
+        if replicas_fail[i]:
+            reasons.append(f"Reliability Error: Prod requires at least 3 replicas, found {replicas_raw[i]}")
+        if sg_missing[i]:
+            reasons.append("Security Error: Missing security_group")
+        elif sg_fail[i]:
+            reasons.append("Security Error: 'default' security group is blocked in prod")
+        report["Blocked"].append({"service": services[i], "reasons": reasons})
+
+    report["Deployable"] = [services[i] for i in np.flatnonzero(~blocked).tolist()]
+    env_codes = env_codes.tolist()
+    report["Warnings"] = [f"{services[i]}: Using default SG in {envs[env_codes[i]]}"
+                          for i in np.flatnonzero(~blocked & sg_default).tolist()]
+    return report
+
+
+def _validate_chunk(validator: ConfigValidator, chunk: List[Dict]) -> List[Dict]:
+    return [validator.validate_one(data) for data in chunk]
+
+
+def summarize(results: Iterable[Dict], details: bool = True) -> Dict:
+    """
+    Reduces per-config results into the validate() report. With details=False
+    only counts are kept, so a fleet-wide run holds O(1) memory.
+    """
+    if not details:
+        counts = {"Deployable": 0, "Blocked": 0, "Warnings": 0}
+        for result in results:
+            counts[result["status"]] += 1
+            if result["warning"]:
+                counts["Warnings"] += 1
+        return counts
+
+    report = {"Deployable": [], "Blocked": [], "Warnings": []}
+    for result in results:
+        if result["status"] == "Blocked":
+            report["Blocked"].append({
+                "service": result["service"],
+                "reasons": result["reasons"]
+            })
+        else:
+            if result["warning"]:
+                report["Warnings"].append(result["warning"])
+            report["Deployable"].append(result["service"])
+    return report
+
+
+def generate_configs(n: int) -> Iterator[Dict]:
+    """Synthetic manifests for benchmarking; roughly a third fail some rule."""
+    envs = ["prod", "dev", "staging"]
+    groups = ["web-sg", "default", None, "cache-sg"]
+    for i in range(n):
+        yield {
+            "service": f"svc-{i}",
+            "env": envs[i % 3],
+            "cpu": 1 + i % 4,
+            "memory": 2 + (i * 7) % 9,
+            "replicas": 1 + i % 5,
+            "security_group": groups[i % 4],
+        }
+
+
+def benchmark(n: int = 1_000_000, workers: int = 4):
+    import time
+
+    # Pre-generated so only rule evaluation is timed
+    sample = list(generate_configs(min(n, 200_000)))
+    for label, v in (("interpreted", ConfigValidator()), ("compiled", CompiledConfigValidator())):
+        start = time.perf_counter()
+        for data in sample:
+            v.validate_one(data)
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {len(sample) / elapsed:,.0f} configs/sec")
+
+    if np is not None:
+        columns = load_columns(sample)
+        for label, fn, data in (("row-at-a-time", ConfigValidator().validate, sample),
+                                ("columnar from dicts", validate_columnar, sample),
+                                ("columnar from columns", validate_columnar, columns)):
+            start = time.perf_counter()
+            fn(data)
+            elapsed = time.perf_counter() - start
+            print(f"{label} report: {len(sample) / elapsed:,.0f} configs/sec")
+
+    validator = ConfigValidator()
+    for label, w in (("serial", 0), (f"{workers} workers", workers)):
+        start = time.perf_counter()
+        counts = summarize(validator.validate_iter(generate_configs(n), workers=w), details=False)
+        elapsed = time.perf_counter() - start
+        print(f"validate_iter {label}: {n:,} configs in {elapsed:.2f}s ({n / elapsed:,.0f}/sec) {counts}")
 
 # --- Example Usage ---
-raw_data = [
-    {"service": "auth-api", "env": "prod", "cpu": 2, "memory": 8, "replicas": 3, "security_group": "web-sg"},
-    {"service": "data-worker", "env": "dev", "cpu": 1, "memory": 1, "replicas": 1, "security_group": "default"},
-    {"service": "cache-node", "env": "prod", "cpu": 1, "memory": 4, "replicas": 2, "security_group": "cache-sg"}
-]
+if __name__ == "__main__":
+    import json
+    import sys
 
-validator = ConfigValidator()
-results = validator.validate(raw_data)
+    raw_data = [
+        {"service": "auth-api", "env": "prod", "cpu": 2, "memory": 8, "replicas": 3, "security_group": "web-sg"},
+        {"service": "data-worker", "env": "dev", "cpu": 1, "memory": 1, "replicas": 1, "security_group": "default"},
+        {"service": "cache-node", "env": "prod", "cpu": 1, "memory": 4, "replicas": 2, "security_group": "cache-sg"}
+    ]
 
-import json
-print(json.dumps(results, indent=2))
\ No newline at end of file
+    validator = ConfigValidator()
+    results = validator.validate(raw_data)
+    print(json.dumps(results, indent=2))
+
+    # Parallel streaming gives the same report
+    assert summarize(validator.validate_iter(raw_data, workers=2, chunk_size=1)) == results
+
+    # So does the compiled rule engine, on the sample and a generated fleet
+    compiled = CompiledConfigValidator()
+    assert compiled.validate(raw_data) == results
+    assert compiled.validate(generate_configs(10_000)) == validator.validate(generate_configs(10_000))
+
+    if np is not None:
+        assert validate_columnar(raw_data) == results
+        fleet = list(generate_configs(10_000))
+        assert validate_columnar(fleet) == validator.validate(fleet)
+        assert validate_columnar(load_columns(fleet)) == validator.validate(fleet)
+        plain = {f: [c.get(f, d) for c in fleet] for f, d in FIELD_DEFAULTS.items()}
+        assert validate_columnar(plain) == validator.validate(fleet)
+        assert validate_columnar([]) == validator.validate([])
+
+    # A second run over unchanged configs is served from the cache
+    import os
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "validation.sqlite")
+        cached = CachedConfigValidator(CompiledConfigValidator(), cache_path)
+        assert cached.validate(raw_data) == results
+        cached.close()
+        cached = CachedConfigValidator(CompiledConfigValidator(), cache_path, max_entries=2)
+        assert cached.validate(raw_data) == results
+        assert cached.stats() == {"hits": 3, "misses": 0}
+        cached.close()
+        print("Cache stats on rerun:", cached.stats())
+
+        # Editing a rule, or a threshold it reads, invalidates the cache
+        class ThresholdValidator(ConfigValidator):
+            MIN_REPLICAS = 3
+
+            def _check_prod_replicas(self, c: Config) -> str:
+                if c.env == "prod" and c.replicas < self.MIN_REPLICAS:
+                    return f"Reliability Error: Prod requires at least {self.MIN_REPLICAS} replicas, found {c.replicas}"
+                return None
+
+        class StricterValidator(ThresholdValidator):
+            MIN_REPLICAS = 2
+
+        class SwappedValidator(ConfigValidator):
+            def _check_cpu_memory_ratio(self, c: Config) -> str:
+                if c.cpu < (c.memory * 2):
+                    return f"Resource Error: Memory ({c.memory}GB) must be at least 2x CPU ({c.cpu})"
+                return None
+
+        hashes = {v().rule_set_hash() for v in (ConfigValidator, ThresholdValidator, StricterValidator, SwappedValidator)}
+        assert len(hashes) == 4
+        cached = CachedConfigValidator(StricterValidator(), cache_path)
+        assert cached.validate(raw_data) == StricterValidator().validate(raw_data)
+        assert cached.stats() == {"hits": 0, "misses": 3}
+        cached.close()
+
+    # The hash is stable across processes, including rules with nested code objects
+    import subprocess
+    probe = ("import ConfigValidator as cv\n"
+             "class V(cv.ConfigValidator):\n"
+             "    def _check_prod_replicas(self, c):\n"
+             "        return next((f'bad {n}' for n in [c.replicas] if c.env in {'prod', 'live'} and n < 3), None)\n"
+             "print(V().rule_set_hash())")
+    here = os.path.dirname(os.path.abspath(__file__))
+    digests = {subprocess.run([sys.executable, "-c", probe], cwd=here, capture_output=True, text=True,
+                              env={**os.environ, "PYTHONHASHSEED": seed}, check=True).stdout
+               for seed in ("1", "2")}
+    assert len(digests) == 1
+
+    if "--benchmark" in sys.argv:
+        benchmark()
\ No newline at end of file
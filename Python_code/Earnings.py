@@ -1,5 +1,8 @@
 from dataclasses import dataclass
-from typing import DefaultDict, Dict
+from typing import DefaultDict, Dict, Iterable, List
+
+from OrderBatching import InMemoryOrderRepository, iter_orders_many
+from SweepLine import weighted_duration
 
 @dataclass
 class OrderInfo:
@@ -15,6 +18,9 @@ class OrderRepository:
     def get_orders(self,dasher_id):
         return [OrderInfo(dasher_id=dasher_id,order_id=12,start_time=2,end_time=3),
                 OrderInfo(dasher_id=dasher_id,order_id=13,start_time=1,end_time=2)]
+
+    def get_orders_many(self, dasher_ids: Iterable[int]) -> Dict[int, List[OrderInfo]]:
+        return {dasher_id: self.get_orders(dasher_id) for dasher_id in dasher_ids}
         
 class PaymentService:
     def __init__(self,orderRepo:OrderRepository):
@@ -25,33 +31,61 @@ class PaymentService:
         if not order:
             return 0
         
-        # OrderTime = DefaultDict(int)
-        events=[]
-        for ord in order:
-            events.append((ord.start_time, 1))
-            events.append((ord.end_time, -1))
-        
-        events.sort()
-        
-        total_amount = 0
-        current_multiplier = 0
-        last_time = events[0][0]
-        
-        for time, change in events:
-            duration = time - last_time
-            
-            total_amount += duration * current_multiplier
+        return weighted_duration((ord.start_time, ord.end_time) for ord in order)
+
+    def calculate_payments(self, dasher_ids: Iterable[int]) -> Dict[int, int]:
+        """
+        Batch payout for many dashers with one bulk order fetch.
+
+        The sweep in calculate_payment integrates the number of active orders over
+        time, which telescopes to the sum of each order's own duration. That lets
+        the batch path skip building and sorting events entirely: O(n) overall.
+        """
+        return {
+            dasher_id: sum(o.end_time - o.start_time for o in orders)
+            for dasher_id, orders in iter_orders_many(self.orderRepo, dasher_ids)
+        }
+
+def benchmark(num_dashers=100_000, orders_per_dasher=30):
+    import random
+    import time
+
+    rng = random.Random(42)
+    orders = {}
+    for dasher_id in range(num_dashers):
+        orders[dasher_id] = []
+        for order_id in range(orders_per_dasher):
+            start = rng.randrange(0, 720)
+            orders[dasher_id].append(OrderInfo(dasher_id, order_id, start, start + rng.randrange(5, 60)))
+
+    class InMemoryRepo(OrderRepository):
+        def get_orders(self, dasher_id):
+            return orders[dasher_id]
 
-            current_multiplier += change
-            last_time = time
-            
-        return total_amount
+    service = PaymentService(InMemoryRepo())
+
+    start = time.perf_counter()
+    single = {dasher_id: service.calculate_payment(dasher_id) for dasher_id in orders}
+    loop_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = service.calculate_payments(orders)
+    batch_elapsed = time.perf_counter() - start
+
+    assert single == batch
+    print(f"{num_dashers:,} dashers x {orders_per_dasher} orders: "
+          f"per-dasher loop {loop_elapsed:.2f}s, batch {batch_elapsed:.2f}s")
 
 if __name__ == "__main__":
+    import sys
+
     repo = OrderRepository()
     service = PaymentService(repo)
     print(service.calculate_payment(1))
 
+    if "--benchmark" in sys.argv:
+        benchmark()
+
 def test_overlap():
     class FakeRepo:
         def get_orders(self, dasher_id):
@@ -71,3 +105,16 @@ def test_no_orders():
 
     service = PaymentService(EmptyRepo())
     assert service.calculate_payment(1) == 0
+
+
+def test_batch_matches_single():
+    service = PaymentService(OrderRepository())
+    assert service.calculate_payments([1, 2]) == {1: 2, 2: 2}
+    assert service.calculate_payments([1])[1] == service.calculate_payment(1)
+
+
+def test_batch_uses_one_round_trip():
+    repo = InMemoryOrderRepository([OrderInfo(1, 1, 1, 3), OrderInfo(1, 2, 2, 4), OrderInfo(2, 3, 0, 5)])
+    service = PaymentService(repo)
+    assert service.calculate_payments([1, 2, 3]) == {1: 4, 2: 5, 3: 0}
+    assert repo.round_trips == 1
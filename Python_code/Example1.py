@@ -1,7 +1,10 @@
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import Iterable, List, Dict
+import heapq
 import logging
 
+from OrderBatching import iter_orders_many
+
 logging.basicConfig(level=logging.INFO)
 
 @dataclass
@@ -30,7 +33,16 @@ class PaymentService:
         self.repo = repo
 
     def calculate_payment(self, dasher_id: int) -> float:
-        orders = self.repo.get_orders(dasher_id)
+        return self._payment_for(self.repo.get_orders(dasher_id))
+
+    def calculate_payments(self, dasher_ids: Iterable[int]) -> Dict[int, float]:
+        """Same as calculate_payment, with all orders fetched in one batch call when the repo supports it."""
+        return {
+            dasher_id: self._payment_for(orders)
+            for dasher_id, orders in iter_orders_many(self.repo, dasher_ids)
+        }
+
+    def _payment_for(self, orders: List[OrderInfo]) -> float:
         if not orders:
             return 0
 
@@ -67,6 +79,70 @@ class PaymentService:
         logging.info(f"base={base_pay}, miles={miles}, peak={peak_bonus}, total={total}")
         return round(total, 2)
 
+
+class EarningsAccumulator:
+    """
+    Running earnings for one dasher's shift, fed order start/end events as they
+    happen instead of recomputing from the full order list.
+
+    Events must arrive in time order; events sharing a timestamp may arrive in any
+    order and are held in a small heap until time moves past them, so ties resolve
+    ends-before-starts exactly like the sort in PaymentService. Each event is
+    O(log n) and total() is O(1) amortized.
+    """
+    def __init__(self):
+        self.open_orders: Dict[int, int] = {}  # order_id -> start
+        self.pending = []  # heap of (time, change) not yet swept
+        self.swept_until = None
+        self.active = 0
+        self.paid_blocks = 0
+        self.miles = 0
+        self.peak_bonus = 0
+
+    def order_started(self, order_id: int, start: int):
+        self._check_order(start)
+        self.open_orders[order_id] = start
+        if start >= 30:   # pretend 30+ mins = peak
+            self.peak_bonus += PaymentService.BASE_PAY * (PaymentService.PEAK_MULTIPLIER - 1)
+        self._push(start, 1)
+
+    def order_finished(self, order_id: int, end: int, miles: float):
+        start = self.open_orders.get(order_id)
+        if start is None or end <= start:
+            raise ValueError("Invalid order")
+        self._check_order(end)
+        del self.open_orders[order_id]
+        self.miles += miles
+        self._push(end, -1)
+
+    def _check_order(self, time: int):
+        # Validate before any state changes so a rejected event leaves the totals untouched.
+        # Everything at swept_until has already been swept, so a tie there is late too.
+        if self.swept_until is not None and time <= self.swept_until:
+            raise ValueError("Event arrived out of order")
+
+    def _push(self, time: int, change: int):
+        heapq.heappush(self.pending, (time, change))
+        # Anything strictly earlier than this event can no longer gain a tie
+        while self.pending[0][0] < time:
+            self.swept_until, change = heapq.heappop(self.pending)
+            self._apply(change)
+
+    def _apply(self, change: int):
+        if self.active > 0:
+            self.paid_blocks += 1
+        self.active += change
+
+    def total(self) -> float:
+        # Sweep the (tiny) same-timestamp frontier provisionally without consuming it
+        active, paid_blocks = self.active, self.paid_blocks
+        for _, change in sorted(self.pending):
+            if active > 0:
+                paid_blocks += 1
+            active += change
+        total = paid_blocks * PaymentService.BASE_PAY + self.miles * PaymentService.MILE_RATE + self.peak_bonus
+        return round(total, 2)
+
 repo = OrderRepository()
 service = PaymentService(repo)
 print(service.calculate_payment(1))
@@ -87,3 +163,49 @@ def test_bad_order():
     except ValueError:
         assert True
 
+
+def test_batch_matches_single():
+    from OrderBatching import InMemoryOrderRepository
+    repo = InMemoryOrderRepository(OrderRepository().get_orders(1) + OrderRepository().get_orders(2))
+    service = PaymentService(repo)
+    assert service.calculate_payments([1, 2]) == {1: service.calculate_payment(1), 2: service.calculate_payment(2)}
+
+
+def test_accumulator_matches_recompute():
+    orders = [OrderInfo(1, 1, 0, 30, 5), OrderInfo(1, 2, 15, 45, 5), OrderInfo(1, 3, 45, 60, 2)]
+    events = sorted([(o.start, 1, o) for o in orders] + [(o.end, 0, o) for o in orders], key=lambda e: e[:2])
+
+    class FixedRepo(OrderRepository):
+        def get_orders(self, dasher_id):
+            return orders
+
+    acc = EarningsAccumulator()
+    for time, is_start, o in events:
+        if is_start:
+            acc.order_started(o.order_id, time)
+        else:
+            acc.order_finished(o.order_id, time, o.miles)
+    assert acc.total() == PaymentService(FixedRepo()).calculate_payment(1)
+
+def test_accumulator_rejects_late_event_without_side_effects():
+    acc = EarningsAccumulator()
+    for order_id, start in [(1, 40), (2, 50), (3, 60)]:
+        acc.order_started(order_id, start)
+    before = (acc.total(), acc.miles, dict(acc.open_orders), acc.peak_bonus)
+    for late_event in (lambda: acc.order_finished(1, 45, 7), lambda: acc.order_started(4, 45)):
+        try:
+            late_event()
+            assert False
+        except ValueError:
+            pass
+    assert (acc.total(), acc.miles, dict(acc.open_orders), acc.peak_bonus) == before
+
+    # An end arriving at an already-swept timestamp would lose ends-before-starts ordering
+    acc = EarningsAccumulator()
+    for order_id, start in [(1, -5), (2, 0), (3, 10)]:
+        acc.order_started(order_id, start)
+    try:
+        acc.order_finished(1, 0, 0)
+        assert False
+    except ValueError:
+        pass
@@ -1,12 +1,21 @@
 from dataclasses import dataclass
-from typing import Optional, List
+from queue import Empty, Queue
+from threading import Condition, Lock, Thread
+from typing import Iterable, List, Optional, Tuple
+import atexit
 import datetime
+import heapq
 import logging
+import sys
+import time
+import weakref
+
+from OrderStateMachine import StateMachine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("OrderStatusService")
 
-@dataclass
+@dataclass(slots=True)
 class OrderInfo:
     order_id: str
     current_status: str
@@ -15,6 +24,10 @@ class OrderInfo:
     dasher_id: Optional[str]
     created_at: str
 
+    def __post_init__(self):
+        # One shared string per status across millions of resident orders
+        self.current_status = sys.intern(self.current_status)
+
 @dataclass
 class StatusUpdate:
     order_id: str
@@ -42,6 +55,7 @@ VALID_TRANSITIONS = {
     "DELIVERED": [],  # Can't transition from DELIVERED (except was None)
     "CANCELLED": []   # Terminal state
 }
+ORDER_STATES = StateMachine(VALID_TRANSITIONS)
 
 class OrderRepository:
     def get_order(self, order_id):
@@ -61,6 +75,215 @@ class NotificationService:
     def notify_status_change(self, order_id, new_status):
         logger.info(f"Notification sent for order {order_id}: {new_status}")
 
+    def notify_status_changes(self, changes: List[Tuple[str, str]],
+                              recipient: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        Batch form of notify_status_change for (order_id, new_status) pairs to one recipient.
+        Returns the changes that were not delivered, so a retry re-sends only those;
+        raising means none of them were delivered.
+        """
+        failed = []
+        for order_id, new_status in changes:
+            try:
+                self.notify_status_change(order_id, new_status)
+            except Exception as e:
+                logger.warning(f"Failed to notify status change for {order_id}: {e}")
+                failed.append((order_id, new_status))
+        return failed
+
+_CLOSE = object()  # queue sentinel telling the outbox worker to drain and stop
+
+# Open outboxes, drained at interpreter exit; weak so finished outboxes can be collected
+_live_outboxes: "weakref.WeakSet[NotificationOutbox]" = weakref.WeakSet()
+
+@atexit.register
+def _close_live_outboxes():
+    for outbox in list(_live_outboxes):
+        outbox.close()
+
+class NotificationOutbox:
+    """
+    Outbox between status updates and the notifier.
+
+    Callers enqueue (recipient, order_id, new_status) changes and return at once.
+    A background thread drains up to `max_batch` queued changes, groups them per
+    recipient and sends each group with one notify_status_changes call. Changes
+    the notifier reports as undelivered are rescheduled with exponential backoff,
+    up to `max_attempts` sends, without holding up other recipients. Each
+    recipient still sees its changes in order: while it has a retry pending, its
+    newer changes wait behind that retry, and a failed change superseded by a
+    later change for the same order in its group is dropped rather than retried.
+
+    The worker thread is started on demand and exits after `idle_timeout` seconds
+    with nothing to do. close() (also run at interpreter exit) delivers what is
+    queued and stops it.
+    """
+    def __init__(self, notify: NotificationService, max_batch: int = 500,
+                 max_attempts: int = 3, base_delay: float = 0.05, idle_timeout: float = 1.0):
+        self.notify = notify
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.idle_timeout = idle_timeout
+        self.queue: Queue = Queue()  # (enqueued_at, [(recipient, order_id, new_status), ...])
+        # Worker-only min-heap of (due, seq, recipient, changes, enqueued_at, attempt),
+        # and each retrying recipient's `changes` list, which later changes join
+        self.retry_heap: List[tuple] = []
+        self.retrying: Dict[Optional[str], List[Tuple[str, str]]] = {}
+        self.retry_seq = 0
+        self.closed = False
+        self.worker: Optional[Thread] = None
+        
+        # Metrics
+        self.lock = Lock()
+        self.idle = Condition(self.lock)  # notified when depth drops to 0
+        self.depth = 0  # changes enqueued but not yet sent or dropped
+        self.sent = 0
+        self.failed = 0
+        self.superseded = 0  # failed changes dropped because a newer status followed
+        self.retries = 0
+        self.last_lag = 0.0  # seconds from enqueue to delivery
+        self.max_lag = 0.0
+        _live_outboxes.add(self)
+
+    def submit(self, changes: List[Tuple[Optional[str], str, str]]):
+        if not changes:
+            return
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Notification outbox is closed")
+            self.depth += len(changes)
+            self.queue.put((time.monotonic(), changes))
+            if self.worker is None:
+                self.worker = Thread(target=self._run, daemon=True)
+                self.worker.start()
+
+    def flush(self):
+        """Blocks until everything submitted so far has been sent or dropped."""
+        with self.lock:
+            while self.depth:
+                self.idle.wait()
+
+    def close(self):
+        """Delivers everything queued (including pending retries) and joins the worker."""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            worker = self.worker
+            if worker is not None:
+                self.queue.put(_CLOSE)
+        if worker is not None:
+            worker.join()
+        _live_outboxes.discard(self)
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {
+                "queue_depth": self.depth,
+                "sent": self.sent,
+                "failed": self.failed,
+                "superseded": self.superseded,
+                "retries": self.retries,
+                "last_lag": self.last_lag,
+                "max_lag": self.max_lag,
+            }
+
+    def _run(self):
+        closing = False
+        while True:
+            if self.retry_heap:
+                # Sleep until new work arrives or the earliest retry is due
+                timeout = max(0.0, self.retry_heap[0][0] - time.monotonic())
+            elif closing:
+                return
+            else:
+                timeout = self.idle_timeout
+            try:
+                entry = self.queue.get(timeout=timeout)
+            except Empty:
+                if not self.retry_heap:
+                    with self.lock:
+                        # submit() enqueues under this lock, so nothing can slip in unseen
+                        if self.queue.empty():
+                            self.worker = None
+                            return
+                entry = None
+            
+            by_recipient = {}  # {recipient: ([(order_id, new_status), ...], oldest enqueued_at)}
+            size = 0
+            while entry is not None:
+                if entry is _CLOSE:
+                    closing = True
+                else:
+                    enqueued_at, changes = entry
+                    for recipient, order_id, new_status in changes:
+                        held = self.retrying.get(recipient)
+                        if held is not None:
+                            held.append((order_id, new_status))  # waits behind the pending retry
+                            continue
+                        group = by_recipient.get(recipient)
+                        if group is None:
+                            group = by_recipient[recipient] = ([], enqueued_at)
+                        group[0].append((order_id, new_status))
+                    size += len(changes)
+                    if size >= self.max_batch:
+                        break
+                try:
+                    entry = self.queue.get_nowait()
+                except Empty:
+                    entry = None
+            
+            now = time.monotonic()
+            while self.retry_heap and self.retry_heap[0][0] <= now:
+                _, _, recipient, changes, enqueued_at, attempt = heapq.heappop(self.retry_heap)
+                del self.retrying[recipient]
+                self._send(recipient, changes, enqueued_at, attempt)
+            for recipient, (changes, enqueued_at) in by_recipient.items():
+                self._send(recipient, changes, enqueued_at, 0)
+
+    def _send(self, recipient, changes, enqueued_at, attempt):
+        try:
+            failed = self.notify.notify_status_changes(changes, recipient=recipient) or []
+        except Exception as e:
+            logger.warning(f"Notification to {recipient} failed (attempt {attempt + 1}): {e}")
+            failed = changes
+        
+        superseded = 0
+        if failed:
+            # A failed status is stale once a later change for the same order is in the group
+            last_index = {order_id: i for i, (order_id, _) in enumerate(changes)}
+            failed_set = set(failed)
+            kept = [change for i, change in enumerate(changes)
+                    if change in failed_set and last_index[change[0]] == i]
+            superseded = len(failed) - len(kept)
+            failed = kept
+        
+        retry = bool(failed) and attempt + 1 < self.max_attempts
+        if retry:
+            self.retry_seq += 1
+            due = time.monotonic() + self.base_delay * 2 ** attempt
+            self.retrying[recipient] = pending = list(failed)
+            heapq.heappush(self.retry_heap, (due, self.retry_seq, recipient, pending, enqueued_at, attempt + 1))
+        
+        delivered = len(changes) - len(failed) - superseded
+        lag = time.monotonic() - enqueued_at
+        with self.lock:
+            self.depth -= len(changes) - (len(failed) if retry else 0)
+            self.sent += delivered
+            self.superseded += superseded
+            if delivered:
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+            if retry:
+                self.retries += 1
+            else:
+                self.failed += len(failed)
+            if not self.depth:
+                self.idle.notify_all()
+        if failed and not retry:
+            logger.error(f"Dropped {len(failed)} notifications for {recipient}")
+
 class OrderStatusService:
     def __init__(self, orderRepo: OrderRepository, notify: NotificationService):
         self.orderRepo = orderRepo
@@ -77,13 +300,48 @@ class OrderStatusService:
         
         # Cache order info
         self.orders_cache = {}  # {order_id: OrderInfo}
+        
+        # Notifications are sent off the update path, started on first use
+        self.outbox: Optional[NotificationOutbox] = None
+    
+    def _load_order(self, order_id: str) -> Optional[OrderInfo]:
+        """Read-through cache: hits the repo only the first time an order is seen"""
+        order = self.orders_cache.get(order_id)
+        if order is not None:
+            return order
+        
+        orders = self.orderRepo.get_order(order_id)
+        if not orders:
+            return None
+        
+        # First time seeing this order - initialize
+        order = orders[0]
+        old_status = order.current_status
+        self.current_status[order_id] = old_status
+        self.orders_cache[order_id] = order
+        
+        # Add to status index
+        if old_status not in self.status_index:
+            self.status_index[old_status] = set()
+        self.status_index[old_status].add(order_id)
+        
+        # Record initial status in history
+        if order_id not in self.status_history:
+            self.status_history[order_id] = []
+        self.status_history[order_id].append(StatusHistory(
+            order_id=order_id,
+            status=old_status,
+            updated_by="system",
+            timestamp=order.created_at
+        ))
+        return order
     
     def update_status(self, order_id: str, new_status: str, updated_by: str) -> StatusUpdate:
         """Update order status with validation"""
+        self._check_open()
         
         # 1. Get order
-        orders = self.orderRepo.get_order(order_id)
-        if not orders or len(orders) == 0:
+        if self._load_order(order_id) is None:
             return StatusUpdate(
                 order_id=order_id,
                 old_status="",
@@ -94,34 +352,11 @@ class OrderStatusService:
                 error_message="Order not found"
             )
         
-        order = orders[0]
-        
         # 2. Determine current status
-        if order_id in self.current_status:
-            old_status = self.current_status[order_id]
-        else:
-            # First time seeing this order - initialize
-            old_status = order.current_status
-            self.current_status[order_id] = old_status
-            self.orders_cache[order_id] = order
-            
-            # Add to status index
-            if old_status not in self.status_index:
-                self.status_index[old_status] = set()
-            self.status_index[old_status].add(order_id)
-            
-            # Record initial status in history
-            if order_id not in self.status_history:
-                self.status_history[order_id] = []
-            self.status_history[order_id].append(StatusHistory(
-                order_id=order_id,
-                status=old_status,
-                updated_by="system",
-                timestamp=order.created_at
-            ))
+        old_status = self.current_status[order_id]
         
         # 3. Validate transition
-        if new_status not in VALID_TRANSITIONS.get(old_status, []):
+        if not ORDER_STATES.can_transition(old_status, new_status):
             return StatusUpdate(
                 order_id=order_id,
                 old_status=old_status,
@@ -132,7 +367,8 @@ class OrderStatusService:
                 error_message=f"Invalid transition: {old_status} -> {new_status}"
             )
         
-        # 4. Update current status
+        # 4. Update current status (interned, like the cached OrderInfo)
+        new_status = sys.intern(new_status)
         self.current_status[order_id] = new_status
         
         # 5. Update status index (remove from old, add to new)
@@ -154,11 +390,8 @@ class OrderStatusService:
         # 7. Update cached order info
         self.orders_cache[order_id].current_status = new_status
         
-        # 8. Try to notify (don't fail if notification fails)
-        try:
-            self.notify.notify_status_change(order_id, new_status)
-        except Exception as e:
-            logger.error(f"Failed to notify status change: {e}")
+        # 8. Queue the notification (sent and retried in the background)
+        self._get_outbox().submit([(self.orders_cache[order_id].customer_id, order_id, new_status)])
         
         # 9. Return success
         return StatusUpdate(
@@ -171,6 +404,78 @@ class OrderStatusService:
             error_message=None
         )
     
+    def update_statuses(self, batch: Iterable[Tuple[str, str, str]]) -> List[StatusUpdate]:
+        """
+        Applies (order_id, new_status, updated_by) updates in order.
+
+        Shares one timestamp across the batch, validates with the precomputed
+        transition table, moves orders between status_index sets once per
+        (old, new) group and queues all notifications to the outbox.
+        Returns a StatusUpdate only for the rejected entries.
+        """
+        self._check_open()
+        timestamp = datetime.datetime.now().isoformat()
+        codes = ORDER_STATES.codes
+        allowed = ORDER_STATES.allowed
+        names = ORDER_STATES.names
+        current_status = self.current_status
+        status_history = self.status_history
+        orders_cache = self.orders_cache
+        
+        rejected = []
+        first_status = {}  # {order_id: status before this batch}
+        notifications = []
+        try:
+            for order_id, new_status, updated_by in batch:
+                order = orders_cache.get(order_id) or self._load_order(order_id)
+                if order is None:
+                    rejected.append(StatusUpdate(order_id, "", new_status, updated_by, timestamp, False, "Order not found"))
+                    continue
+                
+                old_status = current_status[order_id]
+                old_code = codes.get(old_status)
+                new_code = codes.get(new_status)
+                if old_code is None or new_code is None or not allowed[old_code] >> new_code & 1:
+                    rejected.append(StatusUpdate(order_id, old_status, new_status, updated_by, timestamp, False,
+                                                 f"Invalid transition: {old_status} -> {new_status}"))
+                    continue
+                
+                first_status.setdefault(order_id, old_status)
+                new_status = names[new_code]  # the table's shared string, not the caller's copy
+                current_status[order_id] = new_status
+                order.current_status = new_status
+                status_history[order_id].append(StatusHistory(order_id, new_status, updated_by, timestamp))
+                notifications.append((order.customer_id, order_id, new_status))
+        finally:
+            # Runs even if the repo raises, so applied entries still reach the index and outbox.
+            # Net move per order, grouped so each index set is touched once per group
+            moves = {}  # {(old_status, final_status): [order_ids]}
+            for order_id, old_status in first_status.items():
+                final_status = current_status[order_id]
+                if final_status != old_status:
+                    moves.setdefault((old_status, final_status), []).append(order_id)
+            for (old_status, final_status), order_ids in moves.items():
+                self.status_index[old_status].difference_update(order_ids)
+                self.status_index.setdefault(final_status, set()).update(order_ids)
+            
+            self._get_outbox().submit(notifications)
+        return rejected
+    
+    def close(self):
+        """Delivers queued notifications and stops the outbox worker"""
+        if self.outbox is not None:
+            self.outbox.close()
+    
+    def _check_open(self):
+        # Before any state changes: a closed outbox could not send the notification
+        if self.outbox is not None and self.outbox.closed:
+            raise RuntimeError("OrderStatusService is closed")
+    
+    def _get_outbox(self) -> NotificationOutbox:
+        if self.outbox is None:
+            self.outbox = NotificationOutbox(self.notify)
+        return self.outbox
+    
     def getOrderStatus(self, order_id: str) -> Optional[OrderInfo]:
         """Get current order status"""
         if order_id not in self.orders_cache:
@@ -284,6 +589,208 @@ def test_order_not_found():
     assert "not found" in result.error_message.lower()
     print("✓ Test order not found - PASSED")
 
+def test_update_statuses_matches_single_updates():
+    """Bulk path ends in the same state as one update_status call per entry"""
+    class SilentNotifications(NotificationService):
+        def __init__(self):
+            self.sent = []
+        
+        def notify_status_change(self, order_id, new_status):
+            self.sent.append((order_id, new_status))
+    
+    batch = [
+        ("order_123", "CONFIRMED", "restaurant"),
+        ("order_123", "READY", "restaurant"),      # invalid, skips PREPARING
+        ("order_123", "PREPARING", "restaurant"),
+        ("missing", "CONFIRMED", "restaurant"),
+    ]
+    single = OrderStatusService(OrderRepository(), SilentNotifications())
+    for order_id, new_status, updated_by in batch:
+        single.update_status(order_id, new_status, updated_by)
+    single.outbox.flush()
+    
+    notifications = SilentNotifications()
+    bulk = OrderStatusService(OrderRepository(), notifications)
+    rejected = bulk.update_statuses(batch)
+    bulk.outbox.flush()
+    
+    assert [r.order_id for r in rejected] == ["order_123", "missing"]
+    for status in VALID_TRANSITIONS:
+        assert bulk.status_index.get(status, set()) == single.status_index.get(status, set())
+    assert [h.status for h in bulk.getStatusHistory("order_123")] == ["PLACED", "CONFIRMED", "PREPARING"]
+    assert bulk.getOrderStatus("order_123").current_status == "PREPARING"
+    
+    # Statuses stay interned after transitions, not just at construction
+    caller_status = "".join(["CON", "FIRMED"])
+    fresh = OrderStatusService(OrderRepository(), SilentNotifications())
+    fresh.update_status("order_123", caller_status, "r")
+    bulk_fresh = OrderStatusService(OrderRepository(), SilentNotifications())
+    bulk_fresh.update_statuses([("order_123", caller_status, "r")])
+    assert fresh.getOrderStatus("order_123").current_status is sys.intern("CONFIRMED")
+    assert bulk_fresh.getOrderStatus("order_123").current_status is sys.intern("CONFIRMED")
+    assert notifications.sent == [("order_123", "CONFIRMED"), ("order_123", "PREPARING")]
+    
+    # Unknown repo status is rejected, and a repo error mid-batch keeps the index in sync
+    class FlakyRepository(OrderRepository):
+        def get_order(self, order_id):
+            if order_id == "boom":
+                raise ConnectionError("repo unavailable")
+            status = "ON_HOLD" if order_id == "b" else "PLACED"
+            return [OrderInfo(order_id, status, "rest_456", "cust_789", None, "2026-01-29T10:00:00")]
+    
+    service = OrderStatusService(FlakyRepository(), SilentNotifications())
+    rejected = service.update_statuses([("a", "CONFIRMED", "r"), ("b", "CONFIRMED", "r")])
+    assert [r.order_id for r in rejected] == ["b"]
+    try:
+        service.update_statuses([("c", "CONFIRMED", "r"), ("boom", "CONFIRMED", "r")])
+        assert False, "repo error should propagate"
+    except ConnectionError:
+        pass
+    service.outbox.flush()
+    assert service.status_index["CONFIRMED"] == {"a", "c"} and not service.status_index["PLACED"]
+    assert [sent[0] for sent in service.notify.sent] == ["a", "c"]
+    print("✓ Test bulk status updates - PASSED")
+
+def test_outbox_batches_per_recipient_and_retries():
+    """Slow or flaky notifiers don't block updates; failed batches are retried"""
+    class FlakyNotifications(NotificationService):
+        def __init__(self):
+            self.calls = []
+            self.failures_left = 1
+        
+        def notify_status_changes(self, changes, recipient=None):
+            if self.failures_left:
+                self.failures_left -= 1
+                raise ConnectionError("notifier unavailable")
+            self.calls.append((recipient, list(changes)))
+    
+    notifications = FlakyNotifications()
+    outbox = NotificationOutbox(notifications, base_delay=0.001)
+    outbox.submit([("cust_1", "o1", "CONFIRMED"), ("cust_2", "o2", "CONFIRMED"), ("cust_1", "o3", "READY")])
+    outbox.flush()
+    
+    assert sorted(notifications.calls) == [
+        ("cust_1", [("o1", "CONFIRMED"), ("o3", "READY")]),
+        ("cust_2", [("o2", "CONFIRMED")]),
+    ]
+    metrics = outbox.metrics()
+    assert metrics["queue_depth"] == 0 and metrics["sent"] == 3 and metrics["retries"] == 1
+    assert metrics["max_lag"] > 0
+    outbox.close()
+    
+    # A partly delivered group retries only what failed; its backoff doesn't delay other recipients
+    class PartialNotifications(NotificationService):
+        def __init__(self):
+            self.sent = []
+            self.down_once = {"o2"}
+        
+        def notify_status_change(self, order_id, new_status):
+            if order_id in self.down_once:
+                self.down_once.discard(order_id)
+                raise ConnectionError("push gateway timeout")
+            self.sent.append((order_id, time.monotonic()))
+    
+    notifications = PartialNotifications()
+    outbox = NotificationOutbox(notifications, base_delay=0.2)
+    outbox.submit([("cust_1", "o1", "CONFIRMED"), ("cust_1", "o2", "CONFIRMED")])
+    outbox.submit([("cust_2", "o3", "CONFIRMED")])
+    submitted_at = time.monotonic()
+    outbox.close()  # drains, including the scheduled retry
+    
+    sent = dict(notifications.sent)
+    assert [order_id for order_id, _ in notifications.sent].count("o1") == 1
+    assert sent["o3"] - submitted_at < 0.2 <= sent["o2"] - submitted_at
+    assert outbox.metrics()["sent"] == 3 and not outbox.worker.is_alive()
+    
+    # Per-recipient order survives retries: a newer status never overtakes a retried one
+    class OrderedNotifications(NotificationService):
+        def __init__(self):
+            self.sent = []
+            self.fail_next = {("o1", "CONFIRMED")}
+        
+        def notify_status_change(self, order_id, new_status):
+            if (order_id, new_status) in self.fail_next:
+                self.fail_next.discard((order_id, new_status))
+                raise ConnectionError("push gateway timeout")
+            self.sent.append((order_id, new_status))
+    
+    notifications = OrderedNotifications()
+    outbox = NotificationOutbox(notifications, base_delay=0.05)
+    outbox.submit([("cust_1", "o1", "CONFIRMED")])
+    while not outbox.metrics()["retries"]:  # first send has failed and its retry is scheduled
+        time.sleep(0.001)
+    outbox.submit([("cust_1", "o1", "PREPARING")])
+    outbox.close()
+    assert notifications.sent == [("o1", "CONFIRMED"), ("o1", "PREPARING")]
+    
+    # In one group, a failed status already followed by a newer one is dropped, not resent
+    notifications = OrderedNotifications()
+    outbox = NotificationOutbox(notifications, base_delay=0.001)
+    outbox.submit([("cust_1", "o1", "CONFIRMED"), ("cust_1", "o1", "PREPARING")])
+    outbox.close()
+    assert notifications.sent == [("o1", "PREPARING")] and outbox.metrics()["superseded"] == 1
+    
+    # Closed services refuse updates before touching any state; idle outboxes can be collected
+    service = OrderStatusService(OrderRepository(), OrderedNotifications())
+    service.update_status("order_123", "CANCELLED", "r")
+    service.close()
+    try:
+        service.update_status("order_123", "CONFIRMED", "r")
+        assert False
+    except RuntimeError:
+        pass
+    assert [h.status for h in service.getStatusHistory("order_123")] == ["PLACED", "CANCELLED"]
+    idle = NotificationOutbox(OrderedNotifications(), idle_timeout=0.01)
+    idle.submit([("cust_1", "o9", "CONFIRMED")])
+    idle.flush()
+    time.sleep(0.1)
+    assert idle.worker is None
+    probe = weakref.ref(idle)
+    del idle
+    import gc
+    gc.collect()
+    assert probe() is None
+    print("✓ Test notification outbox - PASSED")
+
+
+def benchmark(num_orders: int = 100_000):
+    """update_status per entry vs one update_statuses call over the same workload"""
+    import time
+    
+    class DictOrderRepository(OrderRepository):
+        def __init__(self):
+            self.orders = {
+                f"order_{i}": OrderInfo(f"order_{i}", "PLACED", "rest_1", f"cust_{i}", None, "2026-01-29T10:00:00")
+                for i in range(num_orders)
+            }
+        
+        def get_order(self, order_id):
+            order = self.orders.get(order_id)
+            return [OrderInfo(**{f: getattr(order, f) for f in OrderInfo.__slots__})] if order else []
+    
+    class SilentNotifications(NotificationService):
+        def notify_status_change(self, order_id, new_status):
+            pass
+    
+    steps = ["CONFIRMED", "PREPARING", "READY", "PICKED_UP", "DELIVERED"]
+    batch = [(f"order_{i}", status, "bench") for status in steps for i in range(num_orders)]
+    
+    service = OrderStatusService(DictOrderRepository(), SilentNotifications())
+    start = time.perf_counter()
+    for order_id, new_status, updated_by in batch:
+        service.update_status(order_id, new_status, updated_by)
+    service.outbox.flush()
+    single_elapsed = time.perf_counter() - start
+    
+    bulk = OrderStatusService(DictOrderRepository(), SilentNotifications())
+    start = time.perf_counter()
+    bulk.update_statuses(batch)
+    bulk.outbox.flush()
+    bulk_elapsed = time.perf_counter() - start
+    
+    assert all(bulk.status_index.get(s, set()) == service.status_index.get(s, set()) for s in VALID_TRANSITIONS)
+    print(f"{len(batch):,} updates: update_status {single_elapsed:.2f}s, update_statuses {bulk_elapsed:.2f}s")
+
 
 if __name__ == "__main__":
     print("\n" + "="*60)
@@ -296,7 +803,12 @@ if __name__ == "__main__":
     test_get_orders_by_status()
     test_cancelled_from_any_status()
     test_order_not_found()
+    test_update_statuses_matches_single_updates()
+    test_outbox_batches_per_recipient_and_retries()
     
     print("\n" + "="*60)
     print("All tests passed! ✅")
-    print("="*60)
\ No newline at end of file
+    print("="*60)
+    
+    if "--benchmark" in sys.argv:
+        benchmark()
\ No newline at end of file
@@ -1,10 +1,28 @@
+from threading import Lock, local
+
+from OrderStateMachine import StateMachine
+
 class Order:
+    # Slotted record; status is held as a small-int code from ORDER_STATES
+    __slots__=("user_id","items","order_id","_status")
+
     def __init__(self,user_id,items,order_id,status='CREATED'):
         self.user_id=user_id
         self.items=items
         self.status=status
         self.order_id=order_id
 
+    @property
+    def status(self):
+        return ORDER_STATES.names[self._status]
+
+    @status.setter
+    def status(self,value):
+        code=ORDER_STATES.codes.get(value)
+        if code is None:
+            raise ValueError(f"Unknown order status: {value!r}")
+        self._status=code
+
 VALID_TRANSITIONS = {
     "CREATED": ["CONFIRMED"],
     "CONFIRMED": ["PREPARING"],
@@ -12,6 +30,7 @@ VALID_TRANSITIONS = {
     "OUT_FOR_DELIVERY": ["DELIVERED"],
     "DELIVERED": None,
 }   
+ORDER_STATES = StateMachine(VALID_TRANSITIONS)
 
 class OrderRepository:
     def __init__(self):
@@ -22,15 +41,73 @@ class OrderRepository:
     
     def get(self,order_id):
         return self.store[order_id] 
+
+    def compare_and_set_status(self,order_id,expected,new_status):
+        order = self.store[order_id]
+        if order.status != expected:
+            return False
+        order.status = new_status
+        return True
+
+class ShardedOrderRepository:
+    """
+    Thread-safe store: orders are spread over lock-striped shards by id, so
+    threads working on different orders rarely share a lock.
+    """
+    def __init__(self,num_shards=64):
+        self.num_shards=num_shards
+        self.shards=[{} for _ in range(num_shards)]
+        self.locks=[Lock() for _ in range(num_shards)]
+
+    def save(self,order):
+        shard = order.order_id % self.num_shards
+        with self.locks[shard]:
+            self.shards[shard][order.order_id]=order
+
+    def get(self,order_id):
+        shard = order_id % self.num_shards
+        with self.locks[shard]:
+            return self.shards[shard].get(order_id)
+
+    def compare_and_set_status(self,order_id,expected,new_status):
+        """Atomically moves the order to new_status only if it is still in `expected`."""
+        shard = order_id % self.num_shards
+        with self.locks[shard]:
+            order = self.shards[shard].get(order_id)
+            if order is None or order.status != expected:
+                return False
+            order.status = new_status
+            return True
+
+class IdAllocator:
+    """
+    Unique order ids across threads. Each thread reserves a block of ids under a
+    lock and hands them out lock-free; block_size=1 gives strictly sequential ids.
+    """
+    def __init__(self,block_size=1):
+        self.block_size=block_size
+        self.next_block=1
+        self.lock=Lock()
+        self.local=local()
+
+    def next_id(self):
+        block = self.local
+        if getattr(block,"next",0) >= getattr(block,"end",0):
+            with self.lock:
+                block.next = self.next_block
+                self.next_block += self.block_size
+            block.end = block.next + self.block_size
+        order_id = block.next
+        block.next += 1
+        return order_id
            
 class OrderService:
-    def __init__(self,orders):
+    def __init__(self,orders,ids=None):
         self.orders=orders
-        self.sequence=0
+        self.ids=ids or IdAllocator()
         
     def create_order(self,user_id,items):
-        self.sequence+=1
-        order_id=self.sequence
+        order_id=self.ids.next_id()
         order = Order(user_id,items,order_id)
         self.orders.save(order)
         return order_id
@@ -48,14 +125,17 @@ class OrderService:
         self.state_validation(order_id,"DELIVERED")
     
     def state_validation(self,order_id,next_state):
-        order = self.orders.get(order_id)
-        if not order:
-            raise Exception("Order not found")
-        allowed = VALID_TRANSITIONS.get(order.status,[])
-        if next_state not in allowed:
-            raise Exception("Invalid status")
-        order.status=next_state
-        return order
+        # Validate against a snapshot, then compare-and-set; retry if another
+        # thread moved the order in between
+        while True:
+            order = self.orders.get(order_id)
+            if not order:
+                raise Exception("Order not found")
+            current = order.status
+            if not ORDER_STATES.can_transition(current,next_state):
+                raise Exception("Invalid status")
+            if self.orders.compare_and_set_status(order_id,current,next_state):
+                return order
     
     def get_order_status(self,order_id):
         order = self.orders.get(order_id)
@@ -63,6 +143,43 @@ class OrderService:
             raise Exception("Order not found")
         return order.status
     
+
+def benchmark(num_threads=8, orders_per_thread=20_000):
+    """Concurrent create + full lifecycle per order, then a contended confirm race."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    service=OrderService(ShardedOrderRepository(),IdAllocator(block_size=1000))
+
+    def worker(_):
+        for _ in range(orders_per_thread):
+            order_id = service.create_order(1, ["burger"])
+            service.confirm_order(order_id)
+            service.start_preparing(order_id)
+            service.dispatch_order(order_id)
+            service.deliver_order(order_id)
+
+    start=time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        list(pool.map(worker, range(num_threads)))
+    elapsed=time.perf_counter()-start
+    ops=num_threads*orders_per_thread*5
+    stored=sum(len(shard) for shard in service.orders.shards)
+    assert stored==num_threads*orders_per_thread, "order ids collided"
+    print(f"{ops:,} operations on {num_threads} threads in {elapsed:.2f}s ({ops/elapsed:,.0f} ops/sec)")
+
+    # Every thread tries to confirm the same order: exactly one may win
+    order_id = service.create_order(1, ["fries"])
+    def try_confirm(_):
+        try:
+            service.confirm_order(order_id)
+            return True
+        except Exception:
+            return False
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        wins = sum(pool.map(try_confirm, range(num_threads * 10)))
+    assert wins == 1, f"{wins} threads confirmed the same order"
+    print("Contended confirm: exactly one winner")
     
 if __name__=="__main__":
     repo=OrderRepository()
@@ -74,6 +191,16 @@ if __name__=="__main__":
     service.deliver_order(order_id)
 
     assert "DELIVERED" ==service.get_order_status(order_id)
+
+    try:
+        Order(1, ["burger"], 2, status="ON_HOLD")
+        assert False
+    except ValueError:
+        pass
+
+    import sys
+    if "--benchmark" in sys.argv:
+        benchmark()
     
     
         
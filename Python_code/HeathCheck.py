@@ -1,47 +1,360 @@
 #service health aggregator
-from typing import DefaultDict, Dict
+import heapq
+import json
+import math
+import time
+from typing import DefaultDict, Dict, Iterable, List, Optional, Tuple
 
 
 class Service:
+    __slots__ = ("name", "status", "latency", "timestamp")
+
     def __init__(self, data:Dict ):
         self.name = data.get("service", "unknown")
         self.status = data.get("status", "unknown")
         self.latency = data.get("latency_ms", 0)
         self.timestamp = data.get("timestamp", 0)
 
+class _BatchService(Service):
+    """Service created by add_heartbeats; only these are updated in place."""
+    __slots__ = ()
+
+class LatencySketch:
+    """
+    Bounded-memory latency quantiles over a sliding time window.
+
+    Latencies go into log-spaced buckets (each within `relative_accuracy` of the
+    true value, HDR/DDSketch style). The window is split into `slots` sub-windows
+    so old samples can be subtracted out as time moves on. Counts are kept sparse,
+    and each quantile asked for keeps a cursor (its bucket and the count below it)
+    that moves only when the rank crosses a bucket edge; a slot expiring resets
+    the cursors. Adding a sample and reading a quantile are both O(1) amortized.
+    """
+    def __init__(self, window: float = 60, slots: int = 6,
+                 relative_accuracy: float = 0.02, max_latency_ms: float = 600_000):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.num_buckets = int(math.ceil(math.log(max_latency_ms) / self.log_gamma)) + 1
+        self.slot_width = window / slots
+        self.num_slots = slots
+        # Per-slot sparse counts {bucket: count}, plus their running sum
+        self.slots: List[Dict[int, int]] = [{} for _ in range(slots)]
+        self.totals: Dict[int, int] = {}
+        self.count = 0
+        self.last_slot_id: Optional[int] = None
+        # {q: [bucket, samples in buckets below it]}
+        self.cursors: Dict[float, List[int]] = {}
+
+    def _bucket(self, latency: float) -> int:
+        if latency <= 1:
+            return 0
+        return min(int(math.ceil(math.log(latency) / self.log_gamma)), self.num_buckets - 1)
+
+    def _expire_slot(self, pos: int):
+        slot = self.slots[pos]
+        if not slot:
+            return
+        for bucket, n in slot.items():
+            remaining = self.totals[bucket] - n
+            if remaining:
+                self.totals[bucket] = remaining
+            else:
+                del self.totals[bucket]
+            self.count -= n
+        self.slots[pos] = {}
+        self.cursors.clear()
+
+    def add(self, latency: float, timestamp: float):
+        slot_id = int(timestamp // self.slot_width)
+        if self.last_slot_id is None:
+            self.last_slot_id = slot_id
+        elif slot_id > self.last_slot_id:
+            # Clear every sub-window that has fallen out of the window since the last sample
+            for sid in range(self.last_slot_id + 1, min(slot_id, self.last_slot_id + self.num_slots) + 1):
+                self._expire_slot(sid % self.num_slots)
+            self.last_slot_id = slot_id
+
+        bucket = self._bucket(latency)
+        slot = self.slots[slot_id % self.num_slots]
+        slot[bucket] = slot.get(bucket, 0) + 1
+        self.totals[bucket] = self.totals.get(bucket, 0) + 1
+        self.count += 1
+        for cursor in self.cursors.values():
+            if bucket < cursor[0]:
+                cursor[1] += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0
+        rank = q * (self.count - 1)
+        totals = self.totals
+        cursor = self.cursors.get(q)
+        if cursor is None:
+            # Full scan of the occupied buckets, only after a reset
+            below = 0
+            for bucket in sorted(totals):
+                if below + totals[bucket] > rank:
+                    break
+                below += totals[bucket]
+            cursor = self.cursors[q] = [bucket, below]
+        bucket, below = cursor
+        # Walk to the bucket holding `rank`; usually zero or one step
+        while rank < below:
+            bucket -= 1
+            while bucket not in totals:
+                bucket -= 1
+            below -= totals[bucket]
+        while rank >= below + totals.get(bucket, 0):
+            below += totals.get(bucket, 0)
+            bucket += 1
+        cursor[0], cursor[1] = bucket, below
+
+        if bucket == 0:
+            return 1
+        # Midpoint of the bucket (gamma^(i-1), gamma^i]
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
 class HeathCheck:
-    def __init__(self):
+    def __init__(self, default_interval: Optional[float] = None, missed_intervals: int = 3,
+                 latency_rules: Optional[Dict[str, Tuple[str, float]]] = None):
         self.heartbeats: Dict[str, Service] = {}
+        # Maintained incrementally by add_heartbeat, so reading them is O(1)
         self.at_risk=set()
         self.down=set()
+
+        # Staleness: a service is down once it misses `missed_intervals` heartbeats
+        self.default_interval = default_interval
+        self.missed_intervals = missed_intervals
+        self.intervals: Dict[str, float] = {}
+        self.stale = set()
+        # Min-heap of (deadline, service_name); entries superseded by a newer heartbeat are skipped
+        self.deadlines: List[Tuple[float, str]] = []
+
+        # Rolling-percentile rules, e.g. {"at_risk": ("p95", 500), "down": ("p99", 2000)}.
+        # Without rules a service is slow when its latest latency is over 500ms.
+        self.latency_rules = {
+            state: (float(percentile.lstrip("p")) / 100, threshold)
+            for state, (percentile, threshold) in (latency_rules or {}).items()
+        }
+        self.latency_sketches: Dict[str, LatencySketch] = {}
+
+        # Lines add_heartbeats could not decode
+        self.skipped_lines = 0
+
+    def set_expected_interval(self, service_name: str, interval: float):
+        self.intervals[service_name] = interval
+        if service_name in self.heartbeats:
+            self._schedule_deadline(service_name)
+
+    def _deadline(self, service_name: str) -> Optional[float]:
+        interval = self.intervals.get(service_name, self.default_interval)
+        if interval is None:
+            return None
+        return self.heartbeats[service_name].timestamp + interval * self.missed_intervals
+
+    def _schedule_deadline(self, service_name: str):
+        deadline = self._deadline(service_name)
+        if deadline is not None:
+            heapq.heappush(self.deadlines, (deadline, service_name))
     
     def add_heartbeat(self,service:Service):
         current = self.heartbeats.get(service.name)
         if not current or service.timestamp > current.timestamp:
             self.heartbeats[service.name] = service
-    
-    def get_aggregated_health(self):
-        self.at_risk=set()
-        self.down=set()
-        for service_name in self.heartbeats:
+            self._on_heartbeat(service.name)
+
+    def _on_heartbeat(self, service_name: str):
+        if self.latency_rules:
+            sketch = self.latency_sketches.get(service_name)
+            if sketch is None:
+                sketch = self.latency_sketches[service_name] = LatencySketch()
+            service = self.heartbeats[service_name]
+            sketch.add(service.latency, service.timestamp)
+        if self.default_interval is not None or self.intervals:
+            self.stale.discard(service_name)
+            self._schedule_deadline(service_name)
+        self.evaluate_service(service_name)
+
+    def add_heartbeats(self, raw_lines: Iterable[str], batch_size: int = 10_000) -> int:
+        """
+        Bulk path for newline-delimited JSON heartbeats. Each batch is decoded with
+        a single json.loads call and stale timestamps are dropped before any Service
+        is allocated; services first stored by this path are then updated in place.
+        A batch containing a malformed line is decoded line by line
+        instead; bad lines are skipped and counted in `skipped_lines`.
+        Returns heartbeats applied.
+        """
+        applied = 0
+        batch = []
+        for line in raw_lines:
+            line = line.strip()
+            if line:
+                batch.append(line)
+            if len(batch) >= batch_size:
+                applied += self._apply_batch(batch)
+                batch = []
+        if batch:
+            applied += self._apply_batch(batch)
+        return applied
+
+    def _apply_batch(self, batch: List[str]) -> int:
+        heartbeats = self.heartbeats
+        applied = 0
+        for data in self._decode_batch(batch):
+            name = data.get("service", "unknown")
+            timestamp = data.get("timestamp", 0)
+            current = heartbeats.get(name)
+            if current is not None and timestamp <= current.timestamp:
+                continue
+            if type(current) is _BatchService:
+                current.status = data.get("status", "unknown")
+                current.latency = data.get("latency_ms", 0)
+                current.timestamp = timestamp
+            else:
+                # Never mutate a Service the caller passed to add_heartbeat and may still hold
+                heartbeats[name] = _BatchService(data)
+            self._on_heartbeat(name)
+            applied += 1
+        return applied
+
+    def _decode_batch(self, batch: List[str]) -> List[Dict]:
+        try:
+            decoded = json.loads("[" + ",".join(batch) + "]")
+        except json.JSONDecodeError:
+            decoded = None
+        # One object per line, or the line-by-line path decides what to skip
+        # (catches null/5/[] lines and a single line holding "{...}, {...}")
+        if decoded is not None and len(decoded) == len(batch) and all(type(d) is dict for d in decoded):
+            return decoded
+        decoded = []
+        for line in batch:
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                self.skipped_lines += 1
+                continue
+            if isinstance(data, dict):
+                decoded.append(data)
+            else:
+                self.skipped_lines += 1
+        return decoded
+
+    def expire_stale(self, now: Optional[float] = None):
+        """Moves services whose deadline has passed to down; O(log n) per expired entry."""
+        now = time.time() if now is None else now
+        while self.deadlines and self.deadlines[0][0] <= now:
+            deadline, service_name = heapq.heappop(self.deadlines)
+            # Skip entries made obsolete by a later heartbeat or interval change
+            if deadline != self._deadline(service_name) or service_name in self.stale:
+                continue
+            self.stale.add(service_name)
             self.evaluate_service(service_name)
+    
+    def get_aggregated_health(self, now: Optional[float] = None):
+        self.expire_stale(now)
+        return {"at_risk": self.at_risk, "down": self.down}
 
-    def evaluate_service(self, service_name):
-        service = self.heartbeats[service_name]
-        
+    def classify(self, service: Service) -> Optional[str]:
         is_unhealthy = service.status == "unhealthy"
-        is_slow = service.latency > 500
-        is_critical = service.status == "critical"
+        is_slow = self._breaches(service, "at_risk")
+        is_critical = service.status == "critical" or self._breaches(service, "down")
 
         # Check Down first (Highest priority)
         if is_critical or (is_unhealthy and is_slow):
-            self.down.add(service_name)
+            return "down"
         # Only if NOT down, check if it is At Risk
         elif is_unhealthy or is_slow:
+            return "at_risk"
+        return None
+
+    def _breaches(self, service: Service, state: str) -> bool:
+        rule = self.latency_rules.get(state)
+        if rule is None:
+            return state == "at_risk" and service.latency > 500
+        q, threshold = rule
+        sketch = self.latency_sketches.get(service.name)
+        return sketch is not None and sketch.quantile(q) > threshold
+
+    def evaluate_service(self, service_name):
+        # Move only this service between the maintained status sets
+        if service_name in self.stale:
+            state = "down"
+        else:
+            state = self.classify(self.heartbeats[service_name])
+        self.down.discard(service_name)
+        self.at_risk.discard(service_name)
+        if state == "down":
+            self.down.add(service_name)
+        elif state == "at_risk":
             self.at_risk.add(service_name)
+
+
+def benchmark_ingestion(num_services=100_000, num_heartbeats=1_000_000):
+    """Heartbeats/sec for per-line json.loads + Service versus add_heartbeats."""
+    import random
+    import time
+
+    rng = random.Random(42)
+    statuses = ["healthy"] * 8 + ["unhealthy", "critical"]
+    raw_lines = [
+        json.dumps({
+            "service": f"svc-{rng.randrange(num_services)}",
+            "status": rng.choice(statuses),
+            "latency_ms": rng.randrange(1000),
+            # Some heartbeats arrive out of order and must be dropped
+            "timestamp": ts - rng.randrange(3),
+        })
+        for ts in range(num_heartbeats)
+    ]
+
+    health_check = HeathCheck()
+    start = time.perf_counter()
+    for line in raw_lines:
+        health_check.add_heartbeat(Service(json.loads(line)))
+    single = time.perf_counter() - start
+
+    batched_check = HeathCheck()
+    start = time.perf_counter()
+    batched_check.add_heartbeats(raw_lines)
+    batched = time.perf_counter() - start
+
+    assert batched_check.down == health_check.down and batched_check.at_risk == health_check.at_risk
+    print(f"add_heartbeat:  {num_heartbeats / single:,.0f} heartbeats/sec")
+    print(f"add_heartbeats: {num_heartbeats / batched:,.0f} heartbeats/sec")
+
+def benchmark(num_services=100_000, num_heartbeats=1_000_000):
+    """One minute of traffic: 1M heartbeats over 100k services, reading health every 1k."""
+    import random
+    import time
+
+    rng = random.Random(42)
+    statuses = ["healthy"] * 8 + ["unhealthy", "critical"]
+    heartbeats = [
+        Service({
+            "service": f"svc-{rng.randrange(num_services)}",
+            "status": rng.choice(statuses),
+            "latency_ms": rng.randrange(1000),
+            "timestamp": ts,
+        })
+        for ts in range(num_heartbeats)
+    ]
+
+    health_check = HeathCheck()
+    start = time.perf_counter()
+    for i, hb in enumerate(heartbeats):
+        health_check.add_heartbeat(hb)
+        if i % 1000 == 0:
+            health_check.get_aggregated_health()
+    elapsed = time.perf_counter() - start
+
+    print(f"{num_heartbeats:,} heartbeats over {num_services:,} services in {elapsed:.2f}s "
+          f"({num_heartbeats / elapsed:,.0f} heartbeats/sec)")
+    print(f"At risk: {len(health_check.at_risk):,}, Down: {len(health_check.down):,}")
+
     
 if __name__ == "__main__":
     import json
+    import sys
 
     health_check = HeathCheck()
 
@@ -63,5 +376,36 @@ if __name__ == "__main__":
 
     print("At Risk Services:", health_check.at_risk)
     print("Down Services:", health_check.down)
+
+    # "auth" expects a heartbeat every 10s; 3 missed intervals after its last one it is down
+    health_check.set_expected_interval("auth", 10)
+    health_check.get_aggregated_health(now=1625247603 + 30)
+    print("Down Services after auth went silent:", health_check.down)
+
+    # With p95 rules a single 900ms outlier among fast heartbeats no longer flaps to at_risk
+    p95_check = HeathCheck(latency_rules={"at_risk": ("p95", 500), "down": ("p99", 2000)})
+    for ts, latency in enumerate([100] * 30 + [900] + [100] * 5):
+        p95_check.add_heartbeat(Service({"service": "cart", "status": "healthy",
+                                         "latency_ms": latency, "timestamp": 1625247600 + ts}))
+    print("p95 At Risk Services:", p95_check.at_risk)
+
+    # One malformed line only costs itself, not the rest of its batch
+    bulk_check = HeathCheck()
+    applied = bulk_check.add_heartbeats([heartbeats[0], '{"service": "cart", "status"', heartbeats[2]])
+    assert applied == 2 and bulk_check.skipped_lines == 1
+    # Valid JSON that is not one object per line is skipped too
+    applied = bulk_check.add_heartbeats(["null", "[]", heartbeats[3] + ", " + heartbeats[4]])
+    assert applied == 0 and bulk_check.skipped_lines == 4
+    print("Bulk down services:", bulk_check.down)
+
+    # Services handed to add_heartbeat are never mutated by the bulk path
+    payment = Service(json.loads(heartbeats[1]))
+    bulk_check.add_heartbeat(payment)
+    bulk_check.add_heartbeats([heartbeats[4]])
+    assert payment.status == "unhealthy" and bulk_check.heartbeats["payment"].status == "healthy"
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        benchmark_ingestion()
+    
     
-        
\ No newline at end of file
@@ -1,9 +1,29 @@
+import json
+import os
+import time
+
+from OrderStateMachine import StateMachine
+
 # Define Model
 class Order:
+    # Slotted record; status is held as a small-int code from ORDER_STATES
+    __slots__ = ("id", "item", "_status")
+
     def __init__(self,order_id,item,status="CREATED"):
         self.id = order_id
         self.item = item
         self.status = status
+
+    @property
+    def status(self):
+        return ORDER_STATES.names[self._status]
+
+    @status.setter
+    def status(self, value):
+        code = ORDER_STATES.codes.get(value)
+        if code is None:
+            raise ValueError(f"Unknown order status: {value!r}")
+        self._status = code
         
     def __repr__(self):
         return f"Order(id={self.id}, item={self.item}, status={self.status})"
@@ -21,11 +41,130 @@ class OrderRepository:
 
     def exists(self,order_id):
         return order_id in self.store
+
+    def set_status(self,order_id,status):
+        self.store[order_id].status=status
+
+class EventSourcedOrderRepository(OrderRepository):
+    """
+    Durable OrderRepository: every create/transition is appended to a JSON-lines
+    event log (the audit trail) and applied to the in-memory `store`, which serves
+    all reads. Appends are fsync'd in batches of `fsync_every`; every
+    `snapshot_every` events the projection is snapshotted with its log offset, so
+    startup loads the snapshot and replays only the log tail.
+
+    An event is appended only after the change it records has been accepted by
+    the in-memory store, so a rejected write never reaches the log. Snapshots
+    serialize the whole store inline on the write that triggers them, which
+    stalls that write for O(store size); at tens of millions of orders raise
+    `snapshot_every` or snapshot from a background process instead.
+    """
+    def __init__(self,log_path,snapshot_path=None,fsync_every=100,snapshot_every=10_000):
+        super().__init__()
+        self.log_path=log_path
+        self.snapshot_path=snapshot_path or log_path+".snapshot"
+        self.fsync_every=fsync_every
+        self.snapshot_every=snapshot_every
+        self.unsynced=0
+        self.since_snapshot=0
+        self._recover()
+        self.log=open(self.log_path,"ab")
+
+    def _apply(self,event):
+        if event["type"]=="create":
+            self.store[event["id"]]=Order(event["id"],event["item"],event["status"])
+        else:
+            self.store[event["id"]].status=event["status"]
+
+    def _recover(self):
+        offset=0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path) as f:
+                snapshot=json.load(f)
+            offset=snapshot["offset"]
+            for order_id,item,status in snapshot["orders"]:
+                self.store[order_id]=Order(order_id,item,status)
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path,"rb+") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn write from a crash: drop it
+                    f.truncate(offset)
+                    break
+                self._apply(json.loads(line))
+                offset+=len(line)
+
+    def _append(self,event):
+        event["ts"]=time.time()  # wall-clock time of the event, for the audit trail
+        self.log.write(json.dumps(event).encode()+b"\n")
+        self.unsynced+=1
+        self.since_snapshot+=1
+        if self.unsynced>=self.fsync_every:
+            self.flush()
+
+    def _maybe_snapshot(self):
+        # Called once the event is applied, so the snapshot includes it
+        if self.since_snapshot>=self.snapshot_every:
+            self.snapshot()
+
+    def flush(self):
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        self.unsynced=0
+
+    def snapshot(self):
+        self.flush()
+        snapshot={"offset":self.log.tell(),
+                  "orders":[[o.id,o.item,o.status] for o in self.store.values()]}
+        tmp_path=self.snapshot_path+".tmp"
+        with open(tmp_path,"w") as f:
+            json.dump(snapshot,f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path,self.snapshot_path)
+        self.since_snapshot=0
+
+    def save(self,order):
+        # Order's status setter has already validated the status
+        event={"type":"create","id":order.id,"item":order.item,"status":order.status}
+        self._append(event)
+        self.store[order.id]=order
+        self._maybe_snapshot()
+
+    def set_status(self,order_id,status):
+        # Apply first: an unknown id (KeyError) or status (ValueError) must not be logged
+        order=self.store[order_id]
+        previous=order.status
+        order.status=status
+        try:
+            self._append({"type":"transition","id":order_id,"status":status})
+        except Exception:
+            order.status=previous
+            raise
+        self._maybe_snapshot()
+
+    def history(self,order_id):
+        """
+        Audit trail: every recorded event for one order, oldest first, each with
+        its `ts`. Scans the whole log on every call (O(log size)), so it suits
+        audits and debugging, not hot paths.
+        """
+        self.log.flush()
+        with open(self.log_path,"rb") as f:
+            events=(json.loads(line) for line in f)
+            return [e for e in events if e["id"]==order_id]
+
+    def close(self):
+        self.flush()
+        self.log.close()
     
 VALID_TRANSITIONS = {
     "CREATED": ["CONFIRMED"],
     "CONFIRMED": ["DELIVERED"]
 }   
+ORDER_STATES = StateMachine(VALID_TRANSITIONS)
 
 class OrderService:
     def __init__(self,repo):
@@ -45,11 +184,43 @@ class OrderService:
 
     def update_status(self,order_id,new_status):
         order=self.get_order(order_id)
-        allowed = VALID_TRANSITIONS.get(order.status,[])
-        if new_status not in allowed:
+        if not ORDER_STATES.can_transition(order.status,new_status):
             raise Exception("Invalid status")
-        order.status=new_status
+        self.repo.set_status(order_id,new_status)
         return order
+
+def benchmark_recovery(num_orders=100_000):
+    """Startup time: full log replay vs snapshot + tail replay."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path=os.path.join(tmp,"orders.log")
+        repo=EventSourcedOrderRepository(log_path,fsync_every=1000,snapshot_every=10**9)
+        service=OrderService(repo)
+        for order_id in range(num_orders):
+            service.create_order(order_id,"Pizza")
+            service.update_status(order_id,"CONFIRMED")
+        repo.close()
+
+        start=time.perf_counter()
+        EventSourcedOrderRepository(log_path,snapshot_every=10**9).close()
+        replay_elapsed=time.perf_counter()-start
+
+        # Snapshot, then a small tail of newer events
+        repo=EventSourcedOrderRepository(log_path,snapshot_every=10**9)
+        repo.snapshot()
+        for order_id in range(1000):
+            OrderService(repo).update_status(order_id,"DELIVERED")
+        repo.close()
+
+        start=time.perf_counter()
+        recovered=EventSourcedOrderRepository(log_path,snapshot_every=10**9)
+        snapshot_elapsed=time.perf_counter()-start
+        assert recovered.get(0).status=="DELIVERED" and len(recovered.store)==num_orders
+        recovered.close()
+
+    print(f"{num_orders*2:,} events: full replay {replay_elapsed:.2f}s, "
+          f"snapshot + tail {snapshot_elapsed:.2f}s")
     
 #API Layer
 
@@ -80,4 +251,31 @@ if __name__=="__main__":
     try:
         api_update_order_status(1, "DELIVEREDs")  # Cannot jump from CREATED to DELIVERED
     except Exception as e:
-        print(e)
\ No newline at end of file
+        print(e)
+
+    # Event-sourced repository survives a restart
+    import sys
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path=os.path.join(tmp,"orders.log")
+        durable=EventSourcedOrderRepository(log_path,snapshot_every=2)
+        OrderService(durable).create_order(1,"Pizza")
+        OrderService(durable).update_status(1,"CONFIRMED")
+        OrderService(durable).create_order(2,"Burger")
+        durable.close()
+        restarted=OrderService(EventSourcedOrderRepository(log_path))
+        print(restarted.get_order(1), restarted.get_order(2))
+        print([e["status"] for e in restarted.repo.history(1)])
+        assert all("ts" in e for e in restarted.repo.history(1))
+        # Rejected writes leave nothing in the log, so the next restart still recovers
+        for order_id,status in ((99,"CONFIRMED"),(1,"ON_HOLD")):
+            try:
+                restarted.repo.set_status(order_id,status)
+                assert False
+            except (KeyError,ValueError):
+                pass
+        restarted.repo.close()
+        EventSourcedOrderRepository(log_path).close()
+
+    if "--benchmark" in sys.argv:
+        benchmark_recovery()
\ No newline at end of file
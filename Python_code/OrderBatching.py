@@ -0,0 +1,142 @@
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from concurrent.futures import Future
+from threading import Lock, Timer
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Tuple, Union
+
+# --- Batch repository contract ---
+# Payout services call get_orders_many once per run instead of one round trip per dasher.
+
+class IBatchOrderRepository(ABC):
+    @abstractmethod
+    def get_orders_many(self, dasher_ids: Iterable[int]) -> Union[Mapping[int, List[Any]], Iterable[Tuple[int, List[Any]]]]:
+        """Returns {dasher_id: orders} or streams (dasher_id, orders) pairs."""
+        pass
+
+
+def iter_orders_many(repo, dasher_ids: Iterable[int], single_method: str = "get_orders") -> Iterator[Tuple[int, List[Any]]]:
+    """
+    Yields (dasher_id, orders) using the repo's batch call when it has one,
+    falling back to one `single_method` call per dasher for older repos.
+    """
+    if hasattr(repo, "get_orders_many"):
+        result = repo.get_orders_many(dasher_ids)
+        yield from (result.items() if isinstance(result, Mapping) else result)
+    else:
+        fetch_one = getattr(repo, single_method)
+        for dasher_id in dasher_ids:
+            yield dasher_id, fetch_one(dasher_id)
+
+
+class InMemoryOrderRepository(IBatchOrderRepository):
+    """Local stand-in for the order store; counts round trips so tests can assert batching."""
+    def __init__(self, orders: Iterable[Any] = ()):
+        self.orders: Dict[int, List[Any]] = defaultdict(list)
+        for order in orders:
+            self.orders[order.dasher_id].append(order)
+        self.round_trips = 0
+
+    def get_orders(self, dasher_id: int) -> List[Any]:
+        self.round_trips += 1
+        return list(self.orders.get(dasher_id, []))
+
+    # PayoutService.OrderClient naming
+    get_orders_by_dasher = get_orders
+
+    def get_orders_many(self, dasher_ids: Iterable[int]) -> Dict[int, List[Any]]:
+        self.round_trips += 1
+        return {dasher_id: list(self.orders.get(dasher_id, [])) for dasher_id in dasher_ids}
+
+
+class CoalescingOrderFetcher:
+    """
+    Coalesces concurrent single-dasher lookups into one get_orders_many call.
+
+    The first caller opens a batch and schedules a flush after `max_wait` seconds;
+    callers arriving in that window (or asking for the same dasher) share it.
+    A batch that reaches `max_batch` is flushed immediately by the caller that filled it.
+    """
+    def __init__(self, repo: IBatchOrderRepository, max_wait: float = 0.005, max_batch: int = 500):
+        self.repo = repo
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.lock = Lock()
+        self.pending: Dict[int, Future] = {}
+        self.flush_scheduled = False
+
+    def get_orders(self, dasher_id: int) -> List[Any]:
+        batch = None
+        with self.lock:
+            future = self.pending.get(dasher_id)
+            if future is None:
+                future = self.pending[dasher_id] = Future()
+                if len(self.pending) >= self.max_batch:
+                    batch = self._take_pending()
+                elif not self.flush_scheduled:
+                    self.flush_scheduled = True
+                    timer = Timer(self.max_wait, self.flush)
+                    timer.daemon = True
+                    timer.start()
+        if batch:
+            self._run(batch)
+        return future.result()
+
+    get_orders_by_dasher = get_orders
+
+    def flush(self):
+        with self.lock:
+            batch = self._take_pending()
+        if batch:
+            self._run(batch)
+
+    def _take_pending(self) -> Dict[int, Future]:
+        batch = self.pending
+        self.pending = {}
+        self.flush_scheduled = False
+        return batch
+
+    def _run(self, batch: Dict[int, Future]):
+        try:
+            results = dict(iter_orders_many(self.repo, list(batch)))
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for dasher_id, future in batch.items():
+            future.set_result(results.get(dasher_id, []))
+
+
+# ============= TESTS =============
+
+def test_iter_orders_many_falls_back_to_single_calls():
+    class SingleOnlyRepo:
+        def get_orders_by_dasher(self, dasher_id):
+            return [dasher_id]
+
+    pairs = list(iter_orders_many(SingleOnlyRepo(), [1, 2], single_method="get_orders_by_dasher"))
+    assert pairs == [(1, [1]), (2, [2])]
+
+def test_coalescing_fetcher_batches_concurrent_calls():
+    from concurrent.futures import ThreadPoolExecutor
+    from dataclasses import dataclass
+
+    @dataclass
+    class FakeOrder:
+        dasher_id: int
+        order_id: int
+
+    repo = InMemoryOrderRepository([FakeOrder(d, d * 10) for d in range(20)])
+    fetcher = CoalescingOrderFetcher(repo, max_wait=0.05)
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(fetcher.get_orders, list(range(20)) * 2))
+
+    assert results[3] == [FakeOrder(3, 30)]
+    assert results[23] == results[3]
+    assert repo.round_trips < 20
+
+
+if __name__ == "__main__":
+    test_iter_orders_many_falls_back_to_single_calls()
+    test_coalescing_fetcher_batches_concurrent_calls()
+    print("All tests passed!")
@@ -0,0 +1,158 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Shared order state machine used by FoodOrder, Order and Example4.
+# Each module keeps its VALID_TRANSITIONS dict as the readable source of truth;
+# this compiles it to small-int states and one allowed-bitmask per state, so a
+# transition check is a shift and an AND instead of a list scan of strings.
+
+class StateMachine:
+    def __init__(self, transitions: Dict[str, Optional[List[str]]]):
+        names = list(transitions)
+        for targets in transitions.values():
+            for target in targets or []:
+                if target not in names:
+                    names.append(target)
+        if len(names) > 255:
+            raise ValueError("Too many states to fit in a byte")
+
+        self.names: Tuple[str, ...] = tuple(names)
+        self.codes: Dict[str, int] = {name: code for code, name in enumerate(names)}
+        # allowed[from_code] has bit `to_code` set when from -> to is valid
+        self.allowed: List[int] = [0] * len(names)
+        for source, targets in transitions.items():
+            for target in targets or []:
+                self.allowed[self.codes[source]] |= 1 << self.codes[target]
+
+    def code(self, state: str) -> int:
+        return self.codes[state]
+
+    def name(self, code: int) -> str:
+        return self.names[code]
+
+    def can_transition_code(self, current: int, new: int) -> bool:
+        return bool(self.allowed[current] >> new & 1)
+
+    def can_transition(self, current: str, new: str) -> bool:
+        """String facade; unknown states are never valid."""
+        current_code = self.codes.get(current)
+        new_code = self.codes.get(new)
+        if current_code is None or new_code is None:
+            return False
+        return bool(self.allowed[current_code] >> new_code & 1)
+
+    def apply_transitions(self, states: bytearray, batch: Iterable[Tuple[int, int]]) -> List[int]:
+        """
+        Applies (position, new_code) transitions in order to a bytearray of state
+        codes, in place. Invalid transitions are skipped; returns their positions.
+        """
+        allowed = self.allowed
+        rejected = []
+        for position, new in batch:
+            if allowed[states[position]] >> new & 1:
+                states[position] = new
+            else:
+                rejected.append(position)
+        return rejected
+
+
+def benchmark(num_transitions: int = 10_000_000, num_orders: int = 100_000):
+    import random
+    import time
+
+    transitions = {
+        "PLACED": ["CONFIRMED", "CANCELLED"],
+        "CONFIRMED": ["PREPARING", "CANCELLED"],
+        "PREPARING": ["READY", "CANCELLED"],
+        "READY": ["PICKED_UP", "CANCELLED"],
+        "PICKED_UP": ["DELIVERED", "CANCELLED"],
+        "DELIVERED": [],
+        "CANCELLED": [],
+    }
+    machine = StateMachine(transitions)
+    rng = random.Random(42)
+    batch_codes = [(rng.randrange(num_orders), rng.randrange(len(machine.names))) for _ in range(num_transitions)]
+    batch_names = [(position, machine.names[code]) for position, code in batch_codes]
+
+    start = time.perf_counter()
+    statuses = ["PLACED"] * num_orders
+    string_rejected = 0
+    for position, new_status in batch_names:
+        if new_status in transitions.get(statuses[position], []):
+            statuses[position] = new_status
+        else:
+            string_rejected += 1
+    string_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    codes = bytearray([machine.code("PLACED")]) * num_orders
+    rejected = machine.apply_transitions(codes, batch_codes)
+    table_elapsed = time.perf_counter() - start
+
+    assert len(rejected) == string_rejected and [machine.name(c) for c in codes] == statuses
+    print(f"{num_transitions:,} transitions: string lists {string_elapsed:.2f}s, "
+          f"int table {table_elapsed:.2f}s")
+
+
+def benchmark_memory(num_orders: int = 10_000_000):
+    """Resident bytes per order for the order records of FoodOrder, Order and Example4."""
+    import gc
+    import tracemalloc
+
+    import Example4
+    import FoodOrder
+    import Order
+
+    class DictBackedOrder:
+        # Shape of the records before they were slotted
+        def __init__(self, user_id, items, order_id, status="CREATED"):
+            self.user_id = user_id
+            self.items = items
+            self.status = status
+            self.order_id = order_id
+
+    items = ["burger"]  # shared, so only the record itself is measured
+    factories = {
+        "dict-backed": lambda i: DictBackedOrder(i, items, i),
+        "FoodOrder.Order": lambda i: FoodOrder.Order(i, items, i),
+        "Order.Order": lambda i: Order.Order(i, "Pizza"),
+        "Example4.OrderInfo": lambda i: Example4.OrderInfo("order", "PLACED", "rest", "cust", None, "2026-01-29"),
+    }
+    for label, make in factories.items():
+        gc.collect()
+        tracemalloc.start()
+        orders = [make(i) for i in range(num_orders)]
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del orders
+        print(f"{label}: {used / num_orders:.0f} bytes/order at {num_orders:,} orders")
+
+
+# ============= TESTS =============
+
+def test_compiled_table_matches_dict():
+    transitions = {"CREATED": ["CONFIRMED"], "CONFIRMED": ["DELIVERED"], "DELIVERED": None}
+    machine = StateMachine(transitions)
+    assert machine.can_transition("CREATED", "CONFIRMED")
+    assert not machine.can_transition("CREATED", "DELIVERED")
+    assert not machine.can_transition("DELIVERED", "CREATED")
+    assert not machine.can_transition("CREATED", "UNKNOWN")
+
+def test_apply_transitions_in_order():
+    machine = StateMachine({"CREATED": ["CONFIRMED"], "CONFIRMED": ["DELIVERED"]})
+    created, confirmed, delivered = (machine.code(s) for s in ("CREATED", "CONFIRMED", "DELIVERED"))
+    states = bytearray([created, created])
+    rejected = machine.apply_transitions(states, [(0, confirmed), (0, delivered), (1, delivered)])
+    assert rejected == [1]
+    assert list(states) == [delivered, created]
+
+
+if __name__ == "__main__":
+    import sys
+
+    test_compiled_table_matches_dict()
+    test_apply_transitions_in_order()
+    print("All tests passed!")
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        benchmark_memory()
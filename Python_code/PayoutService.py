@@ -1,8 +1,15 @@
+import csv
 import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 from collections import defaultdict
 
+from OrderBatching import iter_orders_many
+from SweepLine import weighted_duration
+
 # 1. Setup Logging & Exceptions
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("PayoutService")
@@ -14,8 +21,8 @@ class PayoutError(Exception): pass
 class OrderEvent:
     order_id: int
     dasher_id: int
-    start_min: int
-    end_min: int
+    start_min: float  # fractional minutes give sub-minute (e.g. second) resolution
+    end_min: float
 
 # 3. External Service Mock (Upstream Dependency)
 class OrderClient:
@@ -36,41 +43,181 @@ class PayoutService:
 
     def calculate_payout(self, dasher_id: int) -> float:
         """
-        Calculates pay based on concurrent orders per minute.
+        Calculates pay based on concurrent orders over time.
         """
-        logger.info(f"Calculating payout for Dasher: {dasher_id}")
-        
+        logger.info("Calculating payout for Dasher: %s", dasher_id)
         try:
             orders = self.order_client.get_orders_by_dasher(dasher_id)
+        except Exception as e:
+            logger.error("Failed to calculate payout for %s: %s", dasher_id, e)
+            raise PayoutError("Internal service error during payout calculation")
+        return self._payout_for(dasher_id, orders)
+
+    def calculate_payouts(self, dasher_ids: Iterable[int]) -> Dict[int, float]:
+        """
+        Payouts for many dashers. Uses the client's get_orders_many batch call
+        when available instead of one upstream round trip per dasher.
+        """
+        try:
+            batches = list(iter_orders_many(self.order_client, dasher_ids, single_method="get_orders_by_dasher"))
+        except Exception as e:
+            logger.error("Failed to fetch orders for payout batch: %s", e)
+            raise PayoutError("Internal service error during payout calculation")
+        return {dasher_id: self._payout_for(dasher_id, orders) for dasher_id, orders in batches}
+
+    def _payout_for(self, dasher_id: int, orders: List[OrderEvent]) -> float:
+        try:
             if not orders:
-                logger.warning(f"No orders found for dasher {dasher_id}")
+                logger.warning("No orders found for dasher %s", dasher_id)
                 return 0.0
 
-            # Step 1: Map out activity per minute
-            # Key: minute, Value: number of active orders in that minute
-            minute_activity = defaultdict(int)
-            
-            for order in orders:
-                # We assume the 'end_min' is the moment they finish, 
-                # so they are paid for every minute from start until end.
-                for m in range(order.start_min, order.end_min):
-                    minute_activity[m] += 1
-
-            # Step 2: Calculate total pay
-            total_pay = 0.0
-            for minute, count in minute_activity.items():
-                # Rule: # ongoing deliveries * base pay rate
-                pay_for_this_minute = count * self.BASE_RATE
-                total_pay += pay_for_this_minute
-
-            logger.info(f"Payout for {dasher_id} calculated: ${total_pay:.2f}")
+            # Sweep over order start/end events: pay = BASE_RATE x (active orders x minutes).
+            # We assume the 'end_min' is the moment they finish, so they are paid
+            # from start until end; empty or reversed orders earn nothing.
+            active_minutes = weighted_duration(
+                (order.start_min, order.end_min) for order in orders if order.end_min > order.start_min
+            )
+            total_pay = active_minutes * self.BASE_RATE
+
+            logger.info("Payout for %s calculated: $%.2f", dasher_id, total_pay)
             return round(total_pay, 2)
 
         except Exception as e:
-            logger.error(f"Failed to calculate payout for {dasher_id}: {str(e)}")
+            logger.error("Failed to calculate payout for %s: %s", dasher_id, e)
             raise PayoutError("Internal service error during payout calculation")
 
-# --- 5. Execution & Test Coverage ---
+# 5. Nightly Payout Runner
+def _run_partition(order_client: OrderClient, dasher_ids: List[int]) -> Tuple[List[Tuple[int, float]], List[int]]:
+    """Worker: payouts for one partition, returned as (results, failed_dasher_ids)."""
+    # Per-dasher log lines are suppressed in workers; the runner reports aggregates
+    logger.setLevel(logging.WARNING)
+    service = PayoutService(order_client)
+    try:
+        return list(service.calculate_payouts(dasher_ids).items()), []
+    except PayoutError:
+        # Retry one by one so a single bad dasher doesn't fail the whole partition
+        results, failed = [], []
+        for dasher_id in dasher_ids:
+            try:
+                results.append((dasher_id, service.calculate_payout(dasher_id)))
+            except PayoutError:
+                failed.append(dasher_id)
+        return results, failed
+
+class PayoutRunner:
+    """
+    Runs payouts for all dashers across a process pool and streams each finished
+    partition to a CSV file. The CSV doubles as the checkpoint: rerunning after
+    a crash skips dashers already written and resumes with the rest.
+    """
+    def __init__(self, order_client: OrderClient, output_path: str,
+                 max_workers: Optional[int] = None, partition_size: int = 1000):
+        self.order_client = order_client
+        self.output_path = output_path
+        self.max_workers = max_workers
+        self.partition_size = partition_size
+
+    def _load_checkpoint(self) -> Set[int]:
+        if not os.path.exists(self.output_path):
+            return set()
+        with open(self.output_path, 'rb+') as f:
+            # Drop a row half-written when the previous run crashed; only the tail is read
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                if f.read(1) != b"\n":
+                    pos = end
+                    while pos > 0:
+                        pos = max(0, pos - 4096)
+                        f.seek(pos)
+                        newline = f.read(min(4096, end - pos)).rfind(b"\n")
+                        if newline != -1:
+                            pos += newline + 1
+                            break
+                    f.truncate(pos)
+        with open(self.output_path, newline='') as f:
+            return {int(row["dasher_id"]) for row in csv.DictReader(f)}
+
+    def run(self, dasher_ids: Iterable[int]) -> Dict[str, float]:
+        start = time.perf_counter()
+        done = self._load_checkpoint()
+        pending = [d for d in dasher_ids if d not in done]
+        partitions = [pending[i:i + self.partition_size] for i in range(0, len(pending), self.partition_size)]
+
+        written, failed, total_payout = 0, [], 0.0
+        write_header = not os.path.exists(self.output_path) or os.path.getsize(self.output_path) == 0
+        with open(self.output_path, 'a', newline='') as out, \
+                ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            writer = csv.writer(out)
+            if write_header:
+                writer.writerow(["dasher_id", "payout"])
+            futures = [pool.submit(_run_partition, self.order_client, p) for p in partitions]
+            for future in as_completed(futures):
+                results, partition_failed = future.result()
+                writer.writerows(results)
+                # Flush per partition so completed work survives a crash
+                out.flush()
+                os.fsync(out.fileno())
+                written += len(results)
+                total_payout += sum(payout for _, payout in results)
+                failed.extend(partition_failed)
+
+        elapsed = time.perf_counter() - start
+        metrics = {
+            "completed": written,
+            "skipped": len(done),
+            "failed": len(failed),
+            "total_payout": round(total_payout, 2),
+            "elapsed_s": round(elapsed, 3),
+            "dashers_per_sec": round(written / elapsed, 1) if elapsed else 0.0,
+        }
+        logger.info("Payout run finished: %s", metrics)
+        if failed:
+            logger.warning("Payout failed for %d dashers, first ids: %s", len(failed), failed[:10])
+        return metrics
+
+def benchmark(num_dashers=200, orders_per_dasher=40):
+    """12-hour shifts at second resolution: per-second expansion vs the sweep."""
+    import random
+    import time
+
+    rng = random.Random(42)
+    shift_seconds = 12 * 60 * 60
+    orders = {}
+    for dasher_id in range(num_dashers):
+        orders[dasher_id] = []
+        for order_id in range(orders_per_dasher):
+            start = rng.randrange(shift_seconds)
+            end = min(shift_seconds, start + rng.randrange(300, 3600))
+            orders[dasher_id].append(OrderEvent(order_id, dasher_id, start / 60, end / 60))
+
+    # The previous per-minute loop, run at one bucket per second
+    start_time = time.perf_counter()
+    expanded = {}
+    for dasher_id, dasher_orders in orders.items():
+        second_activity = defaultdict(int)
+        for order in dasher_orders:
+            for s in range(round(order.start_min * 60), round(order.end_min * 60)):
+                second_activity[s] += 1
+        expanded[dasher_id] = round(sum(second_activity.values()) * PayoutService.BASE_RATE / 60, 2)
+    expanded_elapsed = time.perf_counter() - start_time
+
+    class BenchClient(OrderClient):
+        def get_orders_by_dasher(self, dasher_id):
+            return orders[dasher_id]
+
+    service = PayoutService(BenchClient())
+    logger.setLevel(logging.WARNING)
+    start_time = time.perf_counter()
+    swept = {dasher_id: service.calculate_payout(dasher_id) for dasher_id in orders}
+    sweep_elapsed = time.perf_counter() - start_time
+    logger.setLevel(logging.INFO)
+
+    assert all(abs(expanded[d] - swept[d]) < 0.011 for d in orders)
+    print(f"{num_dashers:,} dashers x {orders_per_dasher} orders, 12h at 1s: "
+          f"per-second expansion {expanded_elapsed:.2f}s, sweep {sweep_elapsed:.3f}s")
+
+# --- 6. Execution & Test Coverage ---
 if __name__ == "__main__":
     # Dependency Injection
     client = OrderClient()
@@ -88,4 +235,33 @@ if __name__ == "__main__":
     print(f"Final Payout: ${amount}")
     
     assert amount == 6.0, f"Expected 6.0, got {amount}"
-    print("✅ Test Passed!")
\ No newline at end of file
+    print("✅ Test Passed!")
+
+    # Test Case 2: Batch payouts match single calls
+    payouts = service.calculate_payouts([101, 102])
+    assert payouts == {101: 6.0, 102: 6.0}, f"Unexpected batch payouts {payouts}"
+    print("✅ Batch Test Passed!")
+
+    # Test Case 3: Sub-minute orders (30s and 90s overlapping by 30s)
+    class SecondsClient(OrderClient):
+        def get_orders_by_dasher(self, dasher_id):
+            return [OrderEvent(1, dasher_id, 0, 0.5), OrderEvent(2, dasher_id, 0, 1.5)]
+    assert PayoutService(SecondsClient()).calculate_payout(dasher_id) == 0.6
+    print("✅ Sub-minute Test Passed!")
+
+    # Test Case 4: Runner streams to CSV and resumes from it
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "payouts.csv")
+        with open(output_path, 'w') as f:
+            f.write("dasher_id,payout\n1,6.0\n2,6")  # crashed mid-row
+        metrics = PayoutRunner(client, output_path, max_workers=2, partition_size=3).run(range(1, 11))
+        with open(output_path) as f:
+            rows = f.read().splitlines()
+        assert metrics["skipped"] == 1 and metrics["completed"] == 9, metrics
+        assert len(rows) == 11 and sorted(rows[1:]) == sorted(f"{d},6.0" for d in range(1, 11))
+    print("✅ Runner Test Passed!")
+
+    import sys
+    if "--benchmark" in sys.argv:
+        benchmark()
\ No newline at end of file
@@ -1,4 +1,6 @@
 from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Iterable, Optional
 
 @dataclass
 class Orders:
@@ -30,15 +32,215 @@ class OrderRepository:
                 Orders(restaurant_id=restaurant_id,order_id=2,slot_no_occupied=3,start_time=0,end_time=5)]
     
 
+class CapacityIndex:
+    """
+    Concurrent-order load over time for one restaurant.
+
+    A sparse segment tree over integer time [lo, hi) with lazy range-add and
+    range-max: adding/removing an order's [start, end) and asking "max load in
+    [start, end)" are O(log(hi - lo)), and only touched nodes are ever allocated.
+    Nodes are heap-numbered (children of n are 2n and 2n+1). The default range
+    covers negative times and epoch seconds, milliseconds or nanoseconds; times
+    outside it raise ValueError rather than being silently ignored.
+    """
+    def __init__(self, lo: int = -(1 << 62), hi: int = 1 << 62):
+        self.lo = lo
+        self.hi = hi
+        self.max_load: Dict[int, int] = {}  # subtree max, including this node's own add
+        self.added: Dict[int, int] = {}     # lazy add covering this node's whole range
+
+    def _check_range(self, start: int, end: int):
+        if start < self.lo or end > self.hi:
+            raise ValueError(f"Times [{start}, {end}) outside the index range [{self.lo}, {self.hi})")
+
+    def add(self, start: int, end: int, delta: int = 1):
+        if start < end:
+            self._check_range(start, end)
+            self._update(1, self.lo, self.hi, start, end, delta)
+
+    def remove(self, start: int, end: int):
+        self.add(start, end, -1)
+
+    def _update(self, node, lo, hi, start, end, delta):
+        if end <= lo or hi <= start:
+            return
+        if start <= lo and hi <= end:
+            self.added[node] = self.added.get(node, 0) + delta
+            self.max_load[node] = self.max_load.get(node, 0) + delta
+            return
+        mid = (lo + hi) // 2
+        self._update(2 * node, lo, mid, start, end, delta)
+        self._update(2 * node + 1, mid, hi, start, end, delta)
+        self.max_load[node] = self.added.get(node, 0) + max(
+            self.max_load.get(2 * node, 0), self.max_load.get(2 * node + 1, 0)
+        )
+
+    def max_in(self, start: int, end: int) -> int:
+        """Max number of concurrent orders at any time in [start, end)."""
+        if start >= end:
+            return 0
+        self._check_range(start, end)
+        return self._query(1, self.lo, self.hi, start, end)
+
+    def _query(self, node, lo, hi, start, end):
+        if end <= lo or hi <= start:
+            return float("-inf")
+        if node not in self.max_load:
+            return 0  # untouched subtree: no load anywhere below
+        if start <= lo and hi <= end:
+            return self.max_load[node]
+        mid = (lo + hi) // 2
+        return self.added.get(node, 0) + max(
+            self._query(2 * node, lo, mid, start, end),
+            self._query(2 * node + 1, mid, hi, start, end),
+        )
+
+    def earliest_fit(self, length: int, limit: int, start: int, end: int) -> Optional[int]:
+        """
+        Earliest t in [start, end - length] whose whole window [t, t + length) has
+        load <= limit, or None. One left-to-right walk: subtrees entirely under the
+        limit extend the current free run without being descended into.
+        """
+        run_start = None
+
+        def walk(node, lo, hi, acc):
+            nonlocal run_start
+            if hi <= start or end <= lo:
+                return None
+            node_max = self.max_load.get(node)
+            untouched = node_max is None
+            if acc + (0 if untouched else node_max) <= limit:
+                if run_start is None:
+                    run_start = max(lo, start)
+                if min(hi, end) - run_start >= length:
+                    return run_start
+                return None
+            if untouched or hi - lo == 1:
+                run_start = None  # whole subtree is over the limit
+                return None
+            acc += self.added.get(node, 0)
+            mid = (lo + hi) // 2
+            found = walk(2 * node, lo, mid, acc)
+            if found is not None:
+                return found
+            return walk(2 * node + 1, mid, hi, acc)
+
+        if length <= 0 or start + length > end:
+            return None
+        self._check_range(start, end)
+        return walk(1, self.lo, self.hi, 0)
+
+
 class CapacityService:
     def __init__(self, RestRepo: RestaurantRepository, OrdRepo: OrderRepository):
         self.restrepo=RestRepo
         self.ordrepo=OrdRepo
-        
-    def can_accept_order(self, restaurant_id: int, new_start: int, new_end: int) -> bool:
+        # restaurant_id -> CapacityIndex, built from active orders on first use
+        self.indexes: Dict[int, CapacityIndex] = {}
+        # One lock per restaurant, so different restaurants never contend
+        self.locks: Dict[int, Lock] = {}
+        self.locks_guard = Lock()
+
+    def _lock(self, restaurant_id: int) -> Lock:
+        lock = self.locks.get(restaurant_id)
+        if lock is None:
+            with self.locks_guard:
+                lock = self.locks.setdefault(restaurant_id, Lock())
+        return lock
+
+    def _index(self, restaurant_id: int) -> CapacityIndex:
+        # Callers hold the restaurant's lock
+        index = self.indexes.get(restaurant_id)
+        if index is None:
+            index, _ = self._build(restaurant_id)
+        return index
+
+    def _build(self, restaurant_id: int):
+        """Builds the index from active orders; returns it with the order ids it loaded."""
+        index = self.indexes[restaurant_id] = CapacityIndex()
+        loaded = set()
+        for ord in self.ordrepo.get_active_orders(restaurant_id):
+            index.add(ord.start_time, ord.end_time)
+            loaded.add(ord.order_id)
+        return index, loaded
+
+    def add_order(self, order: Orders):
+        """
+        Records a newly active order. If this call builds the index and the repo
+        already lists the order, the build counted it and no delta is applied.
+        """
+        with self._lock(order.restaurant_id):
+            index = self.indexes.get(order.restaurant_id)
+            if index is None:
+                index, loaded = self._build(order.restaurant_id)
+                if order.order_id in loaded:
+                    return
+            index.add(order.start_time, order.end_time)
+
+    def complete_order(self, order: Orders):
+        """
+        Removes a finished order. If this call builds the index and the repo no
+        longer lists the order, the build never counted it and nothing is removed.
+        """
+        with self._lock(order.restaurant_id):
+            index = self.indexes.get(order.restaurant_id)
+            if index is None:
+                index, loaded = self._build(order.restaurant_id)
+                if order.order_id not in loaded:
+                    return
+            index.remove(order.start_time, order.end_time)
+
+    def _get_restaurant(self, restaurant_id: int) -> Restaurant:
         restaurant = self.restrepo.get(restaurant_id)
         if not restaurant:
             raise Exception("Restaurant not found")
+        return restaurant
+
+    def can_accept_order(self, restaurant_id: int, new_start: int, new_end: int) -> bool:
+        restaurant = self._get_restaurant(restaurant_id)
+
+        with self._lock(restaurant_id):
+            # We add +1 because we are trying to fit the NEW order in
+            return self._index(restaurant_id).max_in(new_start, new_end) + 1 <= restaurant.total_slots
+
+    def try_reserve(self, restaurant_id: int, new_start: int, new_end: int) -> bool:
+        """Atomically checks capacity and, if there is room, books [new_start, new_end)."""
+        restaurant = self._get_restaurant(restaurant_id)
+
+        with self._lock(restaurant_id):
+            index = self._index(restaurant_id)
+            if index.max_in(new_start, new_end) + 1 > restaurant.total_slots:
+                return False
+            index.add(new_start, new_end)
+            return True
+
+    def release(self, restaurant_id: int, start: int, end: int):
+        with self._lock(restaurant_id):
+            self._index(restaurant_id).remove(start, end)
+
+    def find_earliest_slot(self, restaurant_id: int, duration: int, not_before: int, horizon: int) -> Optional[int]:
+        """
+        Earliest start >= not_before at which a new order of `duration` fits and
+        still ends by `horizon`; None if there is no such window.
+        """
+        restaurant = self._get_restaurant(restaurant_id)
+
+        with self._lock(restaurant_id):
+            return self._index(restaurant_id).earliest_fit(
+                duration, restaurant.total_slots - 1, not_before, horizon
+            )
+
+    def find_earliest_slots(self, restaurant_ids: Iterable[int], duration: int,
+                            not_before: int, horizon: int) -> Dict[int, Optional[int]]:
+        """Batched find_earliest_slot for ETA quoting across many restaurants."""
+        return {
+            restaurant_id: self.find_earliest_slot(restaurant_id, duration, not_before, horizon)
+            for restaurant_id in restaurant_ids
+        }
+
+    def can_accept_order_scan(self, restaurant_id: int, new_start: int, new_end: int) -> bool:
+        """Original sweep over all active orders; kept as the reference for the index."""
+        restaurant = self._get_restaurant(restaurant_id)
 
         active_orders = self.ordrepo.get_active_orders(restaurant_id)
         
@@ -75,4 +277,166 @@ class CapacityService:
                     return False
 
         return True
-        
\ No newline at end of file
+
+
+def benchmark(active_orders=10_000, checks=2_000):
+    import random
+    import time
+
+    rng = random.Random(42)
+    orders = []
+    for order_id in range(active_orders):
+        start = rng.randrange(0, 100_000)
+        orders.append(Orders(1, order_id, 1, start, start + rng.randrange(10, 500)))
+
+    class BenchOrderRepository(OrderRepository):
+        def get_active_orders(self, restaurant_id):
+            return orders
+
+    restaurant = Restaurant()
+    restaurant.restaurant_id = 1
+    restaurant.total_slots = 50
+    restaurants = RestaurantRepository()
+    restaurants.add(restaurant)
+    service = CapacityService(restaurants, BenchOrderRepository())
+    windows = [(s, s + rng.randrange(10, 500)) for s in (rng.randrange(0, 100_000) for _ in range(checks))]
+
+    start_time = time.perf_counter()
+    scanned = [service.can_accept_order_scan(1, s, e) for s, e in windows]
+    scan_elapsed = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    service._index(1)
+    build_elapsed = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    indexed = [service.can_accept_order(1, s, e) for s, e in windows]
+    index_elapsed = time.perf_counter() - start_time
+
+    assert scanned == indexed
+    print(f"{checks:,} checks at {active_orders:,} active orders: scan {scan_elapsed:.2f}s, "
+          f"index {index_elapsed:.3f}s (+{build_elapsed:.2f}s one-time build)")
+
+
+def stress_benchmark(num_threads=8, attempts_per_thread=5_000, num_restaurants=4, total_slots=5):
+    """Concurrent try_reserve/release; verifies no restaurant is ever over-booked."""
+    import random
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    class EmptyOrderRepository(OrderRepository):
+        def get_active_orders(self, restaurant_id):
+            return []
+
+    restaurants = RestaurantRepository()
+    for restaurant_id in range(num_restaurants):
+        restaurant = Restaurant()
+        restaurant.restaurant_id = restaurant_id
+        restaurant.total_slots = total_slots
+        restaurants.add(restaurant)
+    service = CapacityService(restaurants, EmptyOrderRepository())
+
+    def worker(seed):
+        rng = random.Random(seed)
+        held = []
+        for _ in range(attempts_per_thread):
+            restaurant_id = rng.randrange(num_restaurants)
+            # Negative, small and epoch-millisecond times all go through the same index
+            start = rng.choice((-1_000_000, 0, 1_700_000_000_000)) + rng.randrange(0, 1_000)
+            end = start + rng.randrange(1, 50)
+            if service.try_reserve(restaurant_id, start, end):
+                held.append((restaurant_id, start, end))
+            # Release about a third of bookings so capacity keeps churning
+            if held and rng.random() < 0.3:
+                service.release(*held.pop(rng.randrange(len(held))))
+        return held
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        held = [booking for bookings in pool.map(worker, range(num_threads)) for booking in bookings]
+    elapsed = time.perf_counter() - start_time
+
+    # Independent sweep over the surviving bookings
+    for restaurant_id in range(num_restaurants):
+        events = sorted((t, change) for r, s, e in held if r == restaurant_id for t, change in ((s, 1), (e, -1)))
+        load = peak = 0
+        for _, change in events:
+            load += change
+            peak = max(peak, load)
+        assert peak <= total_slots, f"Restaurant {restaurant_id} over-booked: {peak} > {total_slots}"
+
+    total = num_threads * attempts_per_thread
+    print(f"{total:,} reservation attempts on {num_threads} threads in {elapsed:.2f}s "
+          f"({total / elapsed:,.0f}/sec), no over-booking")
+
+
+if __name__ == "__main__":
+    import sys
+
+    restaurant = Restaurant()
+    restaurant.restaurant_id = 7
+    restaurant.total_slots = 2
+    restaurants = RestaurantRepository()
+    restaurants.add(restaurant)
+    service = CapacityService(restaurants, OrderRepository())
+
+    # Mock orders occupy [2, 7) and [0, 5): two concurrent in [2, 5)
+    assert service.can_accept_order(7, 3, 4) == service.can_accept_order_scan(7, 3, 4) == False
+    assert service.can_accept_order(7, 5, 9) == service.can_accept_order_scan(7, 5, 9) == True
+    service.complete_order(Orders(7, 2, 3, 0, 5))
+    assert service.can_accept_order(7, 3, 4) == True
+    print("✅ Capacity checks passed")
+
+    # try_reserve books the slot; a second identical request no longer fits
+    assert service.try_reserve(7, 3, 4) == True
+    assert service.try_reserve(7, 3, 4) == False
+    service.release(7, 3, 4)
+    assert service.try_reserve(7, 3, 4) == True
+    # Negative windows are capped like any other
+    assert [service.try_reserve(7, -10, -5) for _ in range(3)] == [True, True, False]
+    print("✅ Reservation checks passed")
+
+    # First add/complete on an unbuilt index: the repo's view is counted exactly once
+    service = CapacityService(restaurants, OrderRepository())
+    service.add_order(Orders(7, 1, 1, 2, 7))         # already listed by the repo
+    assert service.indexes[7].max_in(0, 10) == 2
+    service = CapacityService(restaurants, OrderRepository())
+    service.complete_order(Orders(7, 9, 1, 2, 7))    # repo no longer lists it
+    assert service.indexes[7].max_in(0, 10) == 2
+
+    # Fresh service: load is 1 in [0, 2), 2 in [2, 5), 1 in [5, 7) with 2 slots
+    service = CapacityService(restaurants, OrderRepository())
+    assert service.find_earliest_slot(7, 2, 0, 100) == 0
+    assert service.find_earliest_slot(7, 3, 0, 100) == 5
+    assert service.find_earliest_slot(7, 3, 0, 7) == None
+    for duration in range(1, 6):
+        for not_before in range(0, 8):
+            brute = next((t for t in range(not_before, 20 - duration + 1)
+                          if service.can_accept_order(7, t, t + duration)), None)
+            assert service.find_earliest_slot(7, duration, not_before, 20) == brute
+    assert service.find_earliest_slots([7], 3, 0, 100) == {7: 5}
+    print("✅ Earliest slot checks passed")
+
+    # Epoch-millisecond and negative times are indexed like any other, never dropped
+    class EpochOrderRepository(OrderRepository):
+        def get_active_orders(self, restaurant_id):
+            return [Orders(restaurant_id, 1, 1, 1_700_000_000_000, 1_700_000_060_000),
+                    Orders(restaurant_id, 2, 1, 1_700_000_000_000, 1_700_000_060_000),
+                    Orders(restaurant_id, 3, 1, -20, -5),
+                    Orders(restaurant_id, 4, 1, -10, 0)]
+
+    service = CapacityService(restaurants, EpochOrderRepository())
+    for window in [(1_700_000_030_000, 1_700_000_031_000), (1_700_000_060_000, 1_700_000_061_000),
+                   (-12, -8), (-5, 3), (-30, -20)]:
+        assert service.can_accept_order(7, *window) == service.can_accept_order_scan(7, *window), window
+    assert service.find_earliest_slot(7, 5, 1_700_000_000_000, 1_700_000_100_000) == 1_700_000_060_000
+    try:
+        service.can_accept_order(7, 1 << 62, (1 << 62) + 1)
+        assert False
+    except ValueError:
+        pass
+    print("✅ Large and negative time checks passed")
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        stress_benchmark()
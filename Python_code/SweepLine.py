@@ -0,0 +1,46 @@
+from typing import Iterable, Iterator, Tuple
+
+# Shared sweep-line engine for concurrency-weighted payouts (Earnings, PayoutService).
+# Cost is O(n log n) in the number of orders, independent of shift length or time unit.
+
+def sweep(intervals: Iterable[Tuple[float, float]]) -> Iterator[Tuple[float, float, int]]:
+    """Yields (start, end, active) segments where `active` orders overlap."""
+    events = []
+    for start, end in intervals:
+        events.append((start, 1))
+        events.append((end, -1))
+    if not events:
+        return
+
+    # Ends sort before starts at the same instant, so back-to-back orders don't overlap
+    events.sort()
+
+    active = 0
+    last_time = events[0][0]
+    for time, change in events:
+        if active and time > last_time:
+            yield last_time, time, active
+        active += change
+        last_time = time
+
+
+def weighted_duration(intervals: Iterable[Tuple[float, float]]) -> float:
+    """Sum over time of the number of active orders (duration x concurrency)."""
+    return sum((end - start) * active for start, end, active in sweep(intervals))
+
+
+# ============= TESTS =============
+
+def test_sweep_segments():
+    assert list(sweep([(0, 10), (5, 15)])) == [(0, 5, 1), (5, 10, 2), (10, 15, 1)]
+    assert list(sweep([(0, 5), (5, 10)])) == [(0, 5, 1), (5, 10, 1)]
+
+def test_weighted_duration_sub_minute():
+    assert weighted_duration([(0, 0.5), (0.25, 1.0)]) == 1.25
+    assert weighted_duration([]) == 0
+
+
+if __name__ == "__main__":
+    test_sweep_segments()
+    test_weighted_duration_sub_minute()
+    print("All tests passed!")
@@ -1,19 +1,74 @@
 import collections
+import contextlib
+import gzip
+import heapq
+import io
+import json
+import os
 import re
-from typing import Dict, List, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Iterable, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # only needed for .zst archives
+    zstandard = None
+
+GROUP_FIELDS = ("ip", "status", "path", "method")
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+READ_BLOCK_SIZE = 1 << 20  # decompress in 1 MiB blocks
+
+@dataclass(frozen=True)
+class Query:
+    """A group-by/count query, e.g. Query("ip", where=(("status", "404"),), top_n=5)."""
+    group_by: str
+    where: Tuple[Tuple[str, str], ...] = ()
+    top_n: Optional[int] = None
+
+    def __post_init__(self):
+        for field in (self.group_by, *(f for f, _ in self.where)):
+            if field not in GROUP_FIELDS:
+                raise ValueError(f"Unknown field: {field}")
 
 class LogParser:
     def __init__(self, log_path: str):
         self.log_path = log_path
         # Example pattern for Common Log Format: 127.0.0.1 - - [01/Jan/2024...] "GET /index.html" 404 123
         self.log_pattern = re.compile(
-            r'(?P<ip>\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}).*?"\s(?P<status>\d{3})'
+            r'(?P<ip>\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+            r'(?:.*?"(?P<method>[A-Z]+)\s(?P<path>[^\s"]+)[^"]*)?'
+            r'.*?"\s(?P<status>\d{3})'
         )
 
+    @contextlib.contextmanager
+    def _open(self):
+        """
+        Opens the log as text, stream-decompressing gzip/zstd detected by magic
+        bytes. The file is opened once; the magic is peeked from its buffer.
+        """
+        with open(self.log_path, 'rb', buffering=READ_BLOCK_SIZE) as f:
+            magic = f.peek(4)[:4]
+            if magic[:2] == GZIP_MAGIC:
+                raw = io.BufferedReader(gzip.GzipFile(fileobj=f, mode='rb'), buffer_size=READ_BLOCK_SIZE)
+            elif magic == ZSTD_MAGIC:
+                if zstandard is None:
+                    raise RuntimeError(f"zstandard is required to read {self.log_path}")
+                # read_across_frames: multi-frame archives (pzstd, concatenated rotations)
+                raw = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(
+                    f, read_size=READ_BLOCK_SIZE, read_across_frames=True, closefd=False
+                ), buffer_size=READ_BLOCK_SIZE)
+            else:
+                raw = f
+            with io.TextIOWrapper(raw, encoding='utf-8') as text:
+                yield text
+
     def get_lines(self) -> Iterable[str]:
         """Generator to read file line-by-line to save memory (O(1) space)."""
         try:
-            with open(self.log_path, 'r', encoding='utf-8') as f:
+            with self._open() as f:
                 for line in f:
                     yield line
         except FileNotFoundError:
@@ -24,24 +79,196 @@ class LogParser:
         """
         Parses the log and returns the most frequent IPs for a status code.
         """
-        ip_counts = collections.Counter()
+        query = Query("ip", where=(("status", target_status),), top_n=top_n)
+        return self.aggregate({"top_ips": query})["top_ips"]
+
+    def aggregate(self, queries: Dict[str, Query]) -> Dict[str, List[tuple]]:
+        """
+        Evaluates many group-by/count queries in a single pass over the log.
+        Returns {query_name: [(key, count), ...]} ordered by count.
+        """
+        # Queries sharing the same filter share one match check per line
+        by_filter: Dict[tuple, List[tuple]] = collections.defaultdict(list)
+        counters = {}
+        for name, query in queries.items():
+            counters[name] = collections.Counter()
+            by_filter[query.where].append((query.group_by, counters[name]))
 
         for line in self.get_lines():
             match = self.log_pattern.search(line)
-            if match:
-                ip = match.group('ip')
-                status = match.group('status')
-                
-                if status == target_status:
-                    ip_counts[ip] += 1
-        
-        return ip_counts.most_common(top_n)
+            if not match:
+                continue
+            fields = match.groupdict()
+            for where, targets in by_filter.items():
+                if all(fields[f] == value for f, value in where):
+                    for group_by, counter in targets:
+                        key = fields[group_by]
+                        if key is not None:
+                            counter[key] += 1
+
+        return {name: counters[name].most_common(query.top_n)
+                for name, query in queries.items()}
+
+def _aggregate_file(log_path: str, queries: Dict[str, Query]) -> Dict[str, List[tuple]]:
+    # Worker side of aggregate_directory: counts are returned uncapped so they can be merged
+    uncapped = {name: Query(q.group_by, q.where) for name, q in queries.items()}
+    return LogParser(log_path).aggregate(uncapped)
+
+def aggregate_directory(log_dir: str, queries: Dict[str, Query], max_workers: Optional[int] = None) -> Dict[str, List[tuple]]:
+    """
+    Runs aggregate() over every file in a directory of rotated (optionally
+    compressed) logs in parallel, one file per worker, and merges the counters.
+    """
+    paths = sorted(
+        os.path.join(log_dir, name) for name in os.listdir(log_dir)
+        if os.path.isfile(os.path.join(log_dir, name))
+    )
+    merged = {name: collections.Counter() for name in queries}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for partial in pool.map(_aggregate_file, paths, [queries] * len(paths)):
+            for name, counts in partial.items():
+                merged[name].update(dict(counts))
+
+    return {name: merged[name].most_common(query.top_n) for name, query in queries.items()}
+
+class LogFollower:
+    """
+    Tails an ever-growing log. Each poll() only reads bytes appended since the
+    last checkpoint (offset + inode), so a per-minute rerun never rescans the file.
+
+    On rotation (new inode) the old file is first drained from the checkpoint
+    offset, found by its inode among `rotated_paths` (default `<log>.1`, as
+    logrotate names it before any delayed compression). If it has already been
+    moved elsewhere or compressed, lines appended after the last poll are lost,
+    as are lines written before a copytruncate-style truncation.
+    """
+    def __init__(self, parser: LogParser, checkpoint_path: str, rotated_paths: Optional[List[str]] = None):
+        self.parser = parser
+        self.checkpoint_path = checkpoint_path
+        self.rotated_paths = rotated_paths if rotated_paths is not None else [parser.log_path + ".1"]
+        self.inode = None
+        self.offset = 0
+        # status -> Counter(ip)
+        self.counts: Dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+        # status -> lazy max-heap of (-count, ip); entries go stale as counts grow
+        self.heaps: Dict[str, list] = {}
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        self.inode = state["inode"]
+        self.offset = state["offset"]
+        for status, ips in state["counts"].items():
+            self.counts[status] = collections.Counter(ips)
+            self.heaps[status] = [(-count, ip) for ip, count in ips.items()]
+            heapq.heapify(self.heaps[status])
+
+    def _save_checkpoint(self):
+        state = {"inode": self.inode, "offset": self.offset, "counts": self.counts}
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        # Atomic swap so a crash never leaves a half-written checkpoint
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def poll(self) -> int:
+        """Processes newly appended lines and returns how many were read."""
+        try:
+            stat = os.stat(self.parser.log_path)
+        except FileNotFoundError:
+            print(f"Error: File {self.parser.log_path} not found.")
+            return 0
+
+        touched = collections.defaultdict(set)
+        lines_read = 0
+
+        # Rotated (new inode) or truncated (shrunk): start the new file from byte 0
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            if stat.st_ino != self.inode and self.inode is not None:
+                rotated = self._find_rotated()
+                if rotated:
+                    # The rotated file is complete, so a final line without "\n" counts too
+                    lines_read += self._read_lines(rotated, touched, final=True)
+            self.inode = stat.st_ino
+            self.offset = 0
+
+        lines_read += self._read_lines(self.parser.log_path, touched)
+
+        # One heap push per (status, ip) that changed in this batch, not per line
+        for status, ips in touched.items():
+            heap = self.heaps.setdefault(status, [])
+            counter = self.counts[status]
+            for ip in ips:
+                heapq.heappush(heap, (-counter[ip], ip))
+            if len(heap) > 2 * len(counter):
+                self.heaps[status] = [(-count, ip) for ip, count in counter.items()]
+                heapq.heapify(self.heaps[status])
+
+        self._save_checkpoint()
+        return lines_read
+
+    def _find_rotated(self) -> Optional[str]:
+        for path in self.rotated_paths:
+            try:
+                if os.stat(path).st_ino == self.inode:
+                    return path
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _read_lines(self, path: str, touched: Dict[str, set], final: bool = False) -> int:
+        """Counts lines of `path` from the current offset, advancing it past each one read."""
+        lines_read = 0
+        with open(path, 'rb') as f:
+            f.seek(self.offset)
+            for raw in f:
+                # A line without "\n" is still being written; pick it up next poll
+                if not raw.endswith(b"\n") and not final:
+                    break
+                self.offset += len(raw)
+                lines_read += 1
+                match = self.parser.log_pattern.search(raw.decode('utf-8', errors='replace'))
+                if match:
+                    ip, status = match.group('ip'), match.group('status')
+                    self.counts[status][ip] += 1
+                    touched[status].add(ip)
+        return lines_read
+
+    def get_top_ips_by_status(self, target_status: str, top_n: int = 5) -> List[tuple]:
+        """Serves top IPs from maintained state in O(k log n) amortized."""
+        heap = self.heaps.get(target_status, [])
+        counter = self.counts.get(target_status, {})
+        results = []
+        seen = set()
+        while heap and len(results) < top_n:
+            neg_count, ip = heapq.heappop(heap)
+            # Drop stale entries (superseded by a later push) and duplicates
+            if ip in seen or counter[ip] != -neg_count:
+                continue
+            seen.add(ip)
+            results.append((ip, -neg_count))
+        for ip, count in results:
+            heapq.heappush(heap, (-count, ip))
+        return results
 
 # --- Mocking for Tests ---
+import sys
+import tempfile
 import unittest
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 
 class TestLogParser(unittest.TestCase):
+    def _write_log(self, tmp, name, data):
+        path = os.path.join(tmp, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        return path
+
     def test_parser_logic(self):
         # Sample log data with two 404s from one IP and one 404 from another
         mock_data = (
@@ -51,13 +278,119 @@ class TestLogParser(unittest.TestCase):
             '192.168.1.1 - - "GET /d" 200 40\n'
         )
         
-        with patch("builtins.open", mock_open(read_data=mock_data)):
-            parser = LogParser("fake_path.log")
+        with tempfile.TemporaryDirectory() as tmp:
+            parser = LogParser(self._write_log(tmp, "access.log", mock_data))
             results = parser.get_top_ips_by_status("404", top_n=1)
             
             self.assertEqual(len(results), 1)
             self.assertEqual(results[0], ("192.168.1.1", 2))
 
+    def test_aggregate_single_pass(self):
+        mock_data = (
+            '192.168.1.1 - - "GET /a" 404 10\n'
+            '10.0.0.1 - - "POST /a" 500 20\n'
+            '10.0.0.1 - - "GET /b" 404 30\n'
+            '192.168.1.1 - - "GET /a" 200 40\n'
+        )
+
+        module = sys.modules[LogParser.__module__]
+        with tempfile.TemporaryDirectory() as tmp:
+            parser = LogParser(self._write_log(tmp, "access.log", mock_data))
+            with patch.object(module, "open", side_effect=open, create=True) as opened:
+                results = parser.aggregate({
+                    "404_ips": Query("ip", where=(("status", "404"),)),
+                    "500_ips": Query("ip", where=(("status", "500"),)),
+                    "paths": Query("path", top_n=1),
+                    "get_status": Query("status", where=(("method", "GET"),)),
+                })
+
+                # One open: the magic-byte sniff peeks the buffer of the single scan
+                self.assertEqual([c.args[1] for c in opened.call_args_list], ['rb'])
+            self.assertEqual(sorted(results["404_ips"]), [("10.0.0.1", 1), ("192.168.1.1", 1)])
+            self.assertEqual(results["500_ips"], [("10.0.0.1", 1)])
+            self.assertEqual(results["paths"], [("/a", 3)])
+            self.assertEqual(dict(results["get_status"]), {"404": 2, "200": 1})
+
+    def test_follower_reads_only_new_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, "access.log")
+            checkpoint = os.path.join(tmp, "access.ckpt")
+            with open(log_path, 'w') as f:
+                f.write('192.168.1.1 - - "GET /a" 404 10\n10.0.0.1 - - "GET /b" 404 20\n')
+
+            follower = LogFollower(LogParser(log_path), checkpoint)
+            self.assertEqual(follower.poll(), 2)
+
+            with open(log_path, 'a') as f:
+                f.write('10.0.0.1 - - "GET /c" 404 30\n10.0.0.1 - - "GET /d" 4')
+
+            # Restart from the checkpoint: only the complete new line is read
+            follower = LogFollower(LogParser(log_path), checkpoint)
+            self.assertEqual(follower.poll(), 1)
+            self.assertEqual(follower.get_top_ips_by_status("404", top_n=1), [("10.0.0.1", 2)])
+
+            # Truncation restarts from byte 0 but keeps running totals
+            with open(log_path, 'w') as f:
+                f.write('192.168.1.1 - - "GET /a" 404 10\n')
+            self.assertEqual(follower.poll(), 1)
+            self.assertEqual(follower.get_top_ips_by_status("404"), [("10.0.0.1", 2), ("192.168.1.1", 2)])
+
+    def test_follower_drains_rotated_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, "access.log")
+            checkpoint = os.path.join(tmp, "access.ckpt")
+            with open(log_path, 'w') as f:
+                f.write('192.168.1.1 - - "GET /a" 404 10\n')
+            follower = LogFollower(LogParser(log_path), checkpoint)
+            self.assertEqual(follower.poll(), 1)
+
+            # Lines land in the old file after the poll, then logrotate renames it
+            with open(log_path, 'a') as f:
+                f.write('10.0.0.1 - - "GET /b" 404 20\n10.0.0.1 - - "GET /c" 404 30')
+            os.rename(log_path, log_path + ".1")
+            with open(log_path, 'w') as f:
+                f.write('10.0.0.2 - - "GET /d" 404 40\n')
+
+            follower = LogFollower(LogParser(log_path), checkpoint)
+            self.assertEqual(follower.poll(), 3)
+            self.assertEqual(follower.get_top_ips_by_status("404"),
+                             [("10.0.0.1", 2), ("10.0.0.2", 1), ("192.168.1.1", 1)])
+            self.assertEqual(follower.poll(), 0)
+
+    def test_compressed_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with gzip.open(os.path.join(tmp, "access.log.1.gz"), 'wt') as f:
+                f.write('192.168.1.1 - - "GET /a" 404 10\n10.0.0.1 - - "GET /b" 500 20\n')
+            with open(os.path.join(tmp, "access.log"), 'w') as f:
+                f.write('192.168.1.1 - - "GET /a" 404 10\n')
+
+            gz_parser = LogParser(os.path.join(tmp, "access.log.1.gz"))
+            self.assertEqual(gz_parser.get_top_ips_by_status("500"), [("10.0.0.1", 1)])
+
+            results = aggregate_directory(tmp, {
+                "404_ips": Query("ip", where=(("status", "404"),), top_n=1),
+                "paths": Query("path"),
+            }, max_workers=2)
+            self.assertEqual(results["404_ips"], [("192.168.1.1", 2)])
+            self.assertEqual(dict(results["paths"]), {"/a": 2, "/b": 1})
+
+    @unittest.skipUnless(zstandard, "zstandard is not installed")
+    def test_multi_frame_zstd(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Two independently compressed rotations concatenated, as pzstd writes them
+            compressor = zstandard.ZstdCompressor()
+            path = os.path.join(tmp, "access.log.zst")
+            with open(path, 'wb') as f:
+                f.write(compressor.compress(b'192.168.1.1 - - "GET /a" 404 10\n'))
+                f.write(compressor.compress(b'10.0.0.1 - - "GET /b" 404 20\n10.0.0.1 - - "GET /c" 404 30\n'))
+
+            parser = LogParser(path)
+            self.assertEqual(parser.get_top_ips_by_status("404"), [("10.0.0.1", 2), ("192.168.1.1", 1)])
+
+    def test_unknown_query_field(self):
+        with self.assertRaises(ValueError):
+            Query("user_agent")
+
 if __name__ == "__main__":
     # In an interview, you can run the unittest suite directly
     suite = unittest.TestLoader().loadTestsFromTestCase(TestLogParser)